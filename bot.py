@@ -6,6 +6,10 @@ from config import Config
 from aiohttp import web
 from route import web_server
 from helper.database import madflixbotz
+from helper.scratch import sweep_scratch
+from helper.scheduler import outbound_scheduler
+from helper.parallel import close_media_sessions
+from helper.parser import close_parse_pool
 import pyrogram.utils
 import asyncio
 
@@ -25,8 +29,22 @@ class Bot(Client):
             sleep_threshold=15,
         )
 
+    async def invoke(self, query, *args, **kwargs):
+        """Send chat messages, media and edits through the outbound scheduler;
+        FloodWaits come back to it instead of sleeping inside the handler"""
+        chat = outbound_scheduler.chat_of(query)
+        if chat is None:
+            return await super().invoke(query, *args, **kwargs)
+        kwargs["sleep_threshold"] = 0
+        return await outbound_scheduler.submit(chat, lambda: super(Bot, self).invoke(query, *args, **kwargs))
+
     async def start(self):
         try:
+            # Reclaim downloads left behind by a crash, before any handler runs
+            freed = sweep_scratch()
+            if freed:
+                print(f"🧹 Scratch Sweep: freed {freed / (1024 * 1024):.1f} MB")
+            
             await super().start()
             me = await self.get_me()
             self.mention = me.mention
@@ -91,6 +109,8 @@ class Bot(Client):
 
     async def stop(self):
         try:
+            await close_media_sessions()
+            close_parse_pool()
             await super().stop()
             print("🛑 Bot stopped successfully!")
         except Exception as e:
@@ -18,6 +18,39 @@ class Config(object):
     FORCE_SUB   = os.environ.get("FORCE_SUB", "-1002669902570") 
     LOG_CHANNEL = int(os.environ.get("LOG_CHANNEL", "-1002669902570")) if os.environ.get("LOG_CHANNEL", "-1002669902570").strip() else None
     
+    # filename parser configs
+    PARSE_POOL_THRESHOLD = int(os.environ.get("PARSE_POOL_THRESHOLD", "500"))
+    PARSE_POOL_WORKERS   = int(os.environ.get("PARSE_POOL_WORKERS", "2"))
+    PARSE_CHUNK_SIZE     = int(os.environ.get("PARSE_CHUNK_SIZE", "250"))
+
+    # batch transfer configs
+    BATCH_PREFETCH           = int(os.environ.get("BATCH_PREFETCH", "3"))   # files downloaded ahead per user
+    MAX_CONCURRENT_DOWNLOADS = int(os.environ.get("MAX_CONCURRENT_DOWNLOADS", "6"))   # starting limit across all users, tuned at runtime
+    MAX_CONCURRENT_UPLOADS   = int(os.environ.get("MAX_CONCURRENT_UPLOADS", "4"))   # starting limit across all users, tuned at runtime
+    MAX_TRANSFER_LIMIT       = int(os.environ.get("MAX_TRANSFER_LIMIT", "16"))   # ceiling for either limit
+    TRANSFER_WINDOW          = float(os.environ.get("TRANSFER_WINDOW", "10"))   # seconds of throughput per tuning step
+    TRANSFER_RETRIES         = int(os.environ.get("TRANSFER_RETRIES", "3"))   # retries per failed chunk or part
+    PARALLEL_DOWNLOAD_THRESHOLD = int(os.environ.get("PARALLEL_DOWNLOAD_THRESHOLD", str(20 * 1024 * 1024)))   # split files this big into ranges
+    DOWNLOAD_PARTS           = int(os.environ.get("DOWNLOAD_PARTS", "4"))   # ranges fetched at once per file, 1 = off
+    DOWNLOAD_PART_SIZE       = int(os.environ.get("DOWNLOAD_PART_SIZE", str(8 * 1024 * 1024)))   # bytes per range, whole MiB
+    MEDIA_SESSIONS           = int(os.environ.get("MEDIA_SESSIONS", "3"))   # extra media connections per DC
+    UPLOAD_PARTS             = int(os.environ.get("UPLOAD_PARTS", "8"))   # 512 KiB parts sent at once per file, 1 = off
+    CHECKPOINT_INTERVAL      = float(os.environ.get("CHECKPOINT_INTERVAL", "5"))   # seconds between resume checkpoints
+    PARTIAL_TTL              = int(os.environ.get("PARTIAL_TTL", str(6 * 3600)))   # seconds an unfinished download is kept for resuming
+    STREAM_THRESHOLD         = int(os.environ.get("STREAM_THRESHOLD", str(50 * 1024 * 1024)))   # stream files this big without touching disk, 0 = off
+    STREAM_BUFFER_CHUNKS     = int(os.environ.get("STREAM_BUFFER_CHUNKS", "4"))   # 1 MiB chunks held in memory per stream
+    DISK_HEADROOM            = int(os.environ.get("DISK_HEADROOM", str(256 * 1024 * 1024)))   # free space kept on top of every reservation
+    DISK_USAGE_INTERVAL      = float(os.environ.get("DISK_USAGE_INTERVAL", "5"))   # seconds between counts of what running downloads wrote
+    THUMB_CACHE_BYTES        = int(os.environ.get("THUMB_CACHE_BYTES", str(20 * 1024 * 1024)))   # resized thumbnails kept on disk
+    PROGRESS_INTERVAL        = float(os.environ.get("PROGRESS_INTERVAL", "5"))   # seconds between edits of one progress message
+
+    # outbound api scheduler configs
+    OUTBOUND_GLOBAL_RATE  = float(os.environ.get("OUTBOUND_GLOBAL_RATE", "25"))   # chat calls per second, whole bot
+    OUTBOUND_GLOBAL_BURST = int(os.environ.get("OUTBOUND_GLOBAL_BURST", "30"))
+    OUTBOUND_CHAT_RATE    = float(os.environ.get("OUTBOUND_CHAT_RATE", "1"))   # chat calls per second, one chat
+    OUTBOUND_CHAT_BURST   = int(os.environ.get("OUTBOUND_CHAT_BURST", "3"))
+    OUTBOUND_RETRIES      = int(os.environ.get("OUTBOUND_RETRIES", "3"))   # re-queues after FloodWait
+
     # wes response configuration     
     WEBHOOK = bool(os.environ.get("WEBHOOK", "True"))
 
@@ -41,10 +74,17 @@ class Txt(object):
 
 Use These Keywords To Setup Custom File Name
 
-✓ episode :- To Replace Episode Number
-✓ quality :- To Replace Video Resolution
-
-<b>➻ Example :</b> <code> /autorename Naruto Shippuden S02 - EPepisode - quality  [Dual Audio] - @Madflix_Bots </code>
+✓ {{episode}} :- To Replace Episode Number
+✓ {{quality}} :- To Replace Video Resolution
+✓ {{season}} :- To Replace Season Number
+✓ {{filename}} :- Original File Name (Without Extension)
+✓ {{ext}} :- File Extension
+✓ {{filesize}} :- File Size
+✓ {{duration}} :- Video Duration
+✓ {{codec}} / {{audio}} / {{language}} :- Codec, Audio And Language Tags
+✓ {{group}} / {{crc}} :- Release Group And CRC32
+
+<b>➻ Example :</b> <code> /autorename Naruto Shippuden S{{season}} - EP{{episode}} - {{quality}}  [Dual Audio] - @Madflix_Bots </code>
 
 <b>➻ Your Current Auto Rename Format :</b> <code>{format_template}</code> """
     
@@ -0,0 +1,145 @@
+import time, asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from pyrogram.errors import FloodWait
+from config import Config
+
+# Errors that mean "too many transfers at once", not "this file is broken"
+CONGESTION_ERRORS = (FloodWait, asyncio.TimeoutError, TimeoutError)
+
+
+class AdaptiveLimiter:
+    """Concurrency limit for transfers, tuned with AIMD
+
+    Every `window` seconds the bytes moved are compared with the previous
+    window. While all slots were busy and throughput went up by more than
+    `gain`, the limit grows by one. If the last increase did not help, it
+    is undone. A FloodWait or timeout halves the limit straight away.
+    """
+
+    def __init__(self, name, start, minimum=1, maximum=16, window=10.0, gain=0.05):
+        self.name = name
+        self.limit = start
+        self.minimum = minimum
+        self.maximum = maximum
+        self.window = window
+        self.gain = gain
+        self.in_flight = 0
+        self.waiters = deque()
+        self.window_start = time.monotonic()
+        self.window_bytes = 0
+        self.busy = True
+        self.last_rate = 0.0
+        self.grew = False
+        self.last_cut = 0.0
+        self.stats = {'increases': 0, 'decreases': 0, 'congestion': 0}
+
+    async def acquire(self):
+        if not self.in_flight and not self.waiters:
+            # Nothing was moving; don't let the idle gap count as slow throughput
+            self.window_start = time.monotonic()
+            self.window_bytes = 0
+        if self.in_flight < self.limit and not self.waiters:
+            self.in_flight += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        self.waiters.append(future)
+        self.busy = True
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()
+            elif future in self.waiters:
+                self.waiters.remove(future)
+            raise
+
+    def release(self):
+        self.in_flight -= 1
+        self.wake()
+
+    def wake(self):
+        while self.waiters and self.in_flight < self.limit:
+            future = self.waiters.popleft()
+            if not future.done():
+                self.in_flight += 1
+                future.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        try:
+            yield
+        except CONGESTION_ERRORS:
+            self.congestion()
+            raise
+        finally:
+            self.release()
+
+    def record(self, nbytes):
+        """Count transferred bytes; re-evaluates the limit once per window"""
+        self.window_bytes += nbytes
+        if self.in_flight >= self.limit:
+            self.busy = True
+        now = time.monotonic()
+        elapsed = now - self.window_start
+        if elapsed < self.window:
+            return
+        rate = self.window_bytes / elapsed
+        if self.grew and rate <= self.last_rate * (1 + self.gain):
+            # The extra slot bought nothing, give it back
+            self.limit = max(self.minimum, self.limit - 1)
+            self.grew = False
+            self.stats['decreases'] += 1
+        elif self.busy and rate > self.last_rate * (1 + self.gain) and self.limit < self.maximum:
+            self.limit += 1
+            self.grew = True
+            self.stats['increases'] += 1
+            self.wake()
+        else:
+            self.grew = False
+        self.last_rate = rate
+        self.window_start = now
+        self.window_bytes = 0
+        self.busy = self.in_flight >= self.limit
+
+    def congestion(self):
+        """Multiplicative decrease after a FloodWait or timeout"""
+        self.stats['congestion'] += 1
+        now = time.monotonic()
+        if now - self.last_cut < self.window:
+            # Transfers that were already running hit the same limit; one cut is enough
+            return
+        self.last_cut = now
+        self.limit = max(self.minimum, self.limit // 2)
+        self.grew = False
+        self.last_rate = 0.0
+
+    def metrics(self):
+        return {
+            'limit': self.limit,
+            'in_flight': self.in_flight,
+            'queued': len(self.waiters),
+            'rate': self.last_rate,
+            **self.stats,
+        }
+
+
+download_limiter = AdaptiveLimiter(
+    "downloads", Config.MAX_CONCURRENT_DOWNLOADS, maximum=Config.MAX_TRANSFER_LIMIT, window=Config.TRANSFER_WINDOW
+)
+upload_limiter = AdaptiveLimiter(
+    "uploads", Config.MAX_CONCURRENT_UPLOADS, maximum=Config.MAX_TRANSFER_LIMIT, window=Config.TRANSFER_WINDOW
+)
+
+
+def counted(limiter, progress):
+    """Wrap a Pyrogram progress callback so the bytes it reports feed `limiter`"""
+    seen = [0]
+
+    async def callback(current, total, *args):
+        limiter.record(max(0, current - seen[0]))
+        seen[0] = current
+        if progress:
+            await progress(current, total, *args)
+    return callback
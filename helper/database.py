@@ -1,6 +1,8 @@
 import motor.motor_asyncio
 from config import Config
 from .utils import send_log
+from .template import invalidate_template
+from .thumbs import invalidate_thumb
 
 class Database:
 
@@ -129,6 +131,7 @@ class Database:
                     del self.memory_store[int(user_id)]
     
     async def set_thumbnail(self, id, file_id):
+        old_file_id = await self.get_thumbnail(id)
         if self.use_memory:
             user_id = int(id)
             if user_id not in self.memory_store:
@@ -142,6 +145,8 @@ class Database:
                 if user_id not in self.memory_store:
                     self.memory_store[user_id] = self.new_user(user_id)
                 self.memory_store[user_id]['file_id'] = file_id
+        if old_file_id != file_id:
+            invalidate_thumb(old_file_id)
 
     async def get_thumbnail(self, id):
         if self.use_memory:
@@ -196,6 +201,7 @@ class Database:
                 if user_id not in self.memory_store:
                     self.memory_store[user_id] = self.new_user(user_id)
                 self.memory_store[user_id]['format_template'] = format_template
+        invalidate_template(id)
 
     async def get_format_template(self, id):
         if self.use_memory:
@@ -223,6 +229,7 @@ class Database:
                 if user_id not in self.memory_store:
                     self.memory_store[user_id] = self.new_user(user_id)
                 self.memory_store[user_id]['prefix'] = prefix
+        invalidate_template(id)
 
     async def get_prefix(self, id):
         if self.use_memory:
@@ -250,6 +257,7 @@ class Database:
                 if user_id not in self.memory_store:
                     self.memory_store[user_id] = self.new_user(user_id)
                 self.memory_store[user_id]['suffix'] = suffix
+        invalidate_template(id)
 
     async def get_suffix(self, id):
         if self.use_memory:
@@ -0,0 +1,143 @@
+import os, asyncio, psutil
+from collections import deque
+from config import Config
+from .scratch import SCRATCH_ROOT, scratch_usage, drop_idle_partials
+from .utils import humanbytes
+
+
+class DiskSpaceError(Exception):
+    pass
+
+
+class DiskAdmission:
+    """Reserve disk space for a download before it starts
+
+    A download is admitted when free space minus what running downloads have
+    reserved but not written yet still leaves `file_size + headroom`. Bytes
+    already written or preallocated have left the free space, so they are not
+    held back twice. Partial downloads no job is writing only save a refetch
+    and are removed when their space is needed. Otherwise a download waits in
+    FIFO order until a finished job releases its reservation. If nothing is
+    running that could free space, waiting would never end, so it fails right
+    away.
+
+    What running jobs have written is counted by walking downloads/ in a
+    thread every Config.DISK_USAGE_INTERVAL while any job holds space, never
+    on the event loop. Between walks the count only goes down (a finished
+    job's share is taken off), so admission errs towards holding space back.
+    """
+
+    def __init__(self, path, headroom):
+        self.path = path
+        self.headroom = headroom
+        self.reserved = 0
+        self.active = 0
+        self.waiting = deque()
+        # Bytes written by running jobs and held by idle partials, as of the last walk
+        self.written = 0
+        self.idle = 0
+        self.releases = 0
+        self.walker = None
+
+    def free_space(self):
+        os.makedirs(self.path, exist_ok=True)
+        return psutil.disk_usage(self.path).free
+
+    def fits(self, size):
+        written = min(self.reserved, self.written)
+        return self.free_space() - (self.reserved - written) >= size + self.headroom
+
+    def make_room(self, size):
+        """Whether `size` fits, after dropping idle partial downloads if it has to"""
+        if self.fits(size):
+            return True
+        freed = drop_idle_partials()
+        if freed:
+            print(f"Removed {humanbytes(freed)} of idle partial downloads to make room")
+            self.idle = max(0, self.idle - freed)
+        return bool(freed) and self.fits(size)
+
+    def no_space(self, size):
+        return DiskSpaceError(
+            f"Not enough disk space for {humanbytes(size)} "
+            f"(free {humanbytes(self.free_space())})"
+        )
+
+    async def reserve(self, size):
+        """Wait until `size` bytes can be reserved; returns the amount to release"""
+        size = size or 0
+        if not self.waiting and self.make_room(size):
+            self.grant(size)
+            return size
+        if not self.active:
+            raise self.no_space(size)
+
+        entry = (size, asyncio.get_running_loop().create_future())
+        self.waiting.append(entry)
+        try:
+            await entry[1]
+        except asyncio.CancelledError:
+            if entry[1].done() and not entry[1].cancelled():
+                # Granted just as the job was cancelled
+                self.release(size)
+            elif entry in self.waiting:
+                self.waiting.remove(entry)
+                self.wake()
+            raise
+        return size
+
+    def grant(self, size):
+        self.reserved += size
+        self.active += 1
+        if self.walker is None or self.walker.done():
+            self.walker = asyncio.create_task(self.walk())
+
+    def release(self, size):
+        self.reserved -= size
+        self.active -= 1
+        # The job wrote at most `size`, and its files are gone by now
+        self.written = max(0, self.written - size)
+        self.releases += 1
+        self.wake()
+
+    async def walk(self):
+        """Re-count what running jobs have written while any job holds space"""
+        while self.active:
+            releases = self.releases
+            written, idle = await asyncio.to_thread(scratch_usage)
+            # A job that finished during the walk may have been counted before its files went
+            if releases == self.releases:
+                self.written, self.idle = written, idle
+                self.wake()
+            await asyncio.sleep(Config.DISK_USAGE_INTERVAL)
+        self.written = 0
+
+    def wake(self):
+        while self.waiting:
+            size, future = self.waiting[0]
+            if future.done():
+                self.waiting.popleft()
+            elif self.make_room(size):
+                self.waiting.popleft()
+                self.grant(size)
+                future.set_result(None)
+            elif not self.active:
+                self.waiting.popleft()
+                future.set_exception(self.no_space(size))
+            else:
+                break
+
+    async def stats(self):
+        written, idle = await asyncio.to_thread(scratch_usage)
+        return {
+            'free': self.free_space(),
+            'reserved': self.reserved,
+            'written': min(self.reserved, written),
+            'idle_partials': idle,
+            'active': self.active,
+            'queued': len(self.waiting),
+            'queued_bytes': sum(size for size, _ in self.waiting),
+        }
+
+
+disk_space = DiskAdmission(SCRATCH_ROOT, Config.DISK_HEADROOM)
@@ -0,0 +1,76 @@
+import asyncio, itertools
+
+
+class Operation:
+    """One rename job: the tasks doing its work and whether the user cancelled it"""
+
+    def __init__(self, user_id, job_id, name, message=None):
+        self.user_id = user_id
+        self.job_id = job_id
+        self.name = name
+        # Progress message whose cancel button belongs to this job
+        self.message = message
+        self.tasks = set()
+        self.cancelled = False
+
+    def attach(self, task):
+        """Tie a task to this job, so cancelling the job cancels the task"""
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        if self.cancelled:
+            task.cancel()
+        return task
+
+    async def run(self, coro):
+        """Run `coro` as a task of this job and wait for it"""
+        return await self.attach(asyncio.create_task(coro))
+
+    def cancel(self):
+        self.cancelled = True
+        for task in list(self.tasks):
+            task.cancel()
+
+
+class JobRegistry:
+    """Running rename jobs by user id, then job id
+
+    Cancelling a job cancels its tasks, so the transfer stops at the next
+    chunk it waits for; the tasks' own cleanup gives back disk and
+    concurrency reservations and removes the job's files.
+    """
+
+    def __init__(self):
+        self.jobs = {}
+        self.ids = itertools.count(1)
+
+    def add(self, user_id, name, message=None):
+        operation = Operation(user_id, next(self.ids), name, message)
+        self.jobs.setdefault(user_id, {})[operation.job_id] = operation
+        return operation
+
+    def finish(self, operation):
+        user_jobs = self.jobs.get(operation.user_id, {})
+        user_jobs.pop(operation.job_id, None)
+        if not user_jobs:
+            self.jobs.pop(operation.user_id, None)
+
+    def running(self, user_id):
+        """A user's jobs that are not cancelled, oldest first"""
+        return [operation for operation in self.jobs.get(user_id, {}).values() if not operation.cancelled]
+
+    def for_message(self, user_id, message):
+        """Running jobs that report progress on `message`, oldest first"""
+        return [
+            operation for operation in self.running(user_id)
+            if operation.message is not None and operation.message.id == message.id
+        ]
+
+    def cancel(self, user_id, job_id=None):
+        """Cancel one job, or every job of the user; returns the jobs cancelled"""
+        cancelled = [operation for operation in self.running(user_id) if job_id in (None, operation.job_id)]
+        for operation in cancelled:
+            operation.cancel()
+        return cancelled
+
+
+renaming_operations = JobRegistry()
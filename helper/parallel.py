@@ -0,0 +1,385 @@
+import os, json, time, mmap, asyncio
+from collections import deque
+from pyrogram import raw
+from pyrogram.errors import AuthBytesInvalid, FloodWait
+from pyrogram.file_id import FileId
+from pyrogram.session import Auth, Session
+from config import Config
+from .concurrency import download_limiter, upload_limiter, CONGESTION_ERRORS
+from .scratch import PARTIAL_DIR, active_partials, safe_filename, expire_partials
+
+# upload.GetFile works in 1 MiB requests at 1 MiB aligned offsets
+CHUNK_SIZE = 1024 * 1024
+# upload.SaveBigFilePart takes 512 KiB parts, for files above 10 MiB
+UPLOAD_PART_SIZE = 512 * 1024
+BIG_FILE_SIZE = 10 * 1024 * 1024
+
+upload_stats = {'parts': 0, 'retries': 0, 'latency_total': 0.0, 'latency_max': 0.0}
+
+# Extra media sessions per DC, on top of the single one Pyrogram keeps
+session_pools = {}
+session_lock = asyncio.Lock()
+
+
+async def start_media_session(client, dc_id):
+    """Open a media session to `dc_id`, the same way Client.get_file does"""
+    test_mode = await client.storage.test_mode()
+    if dc_id == await client.storage.dc_id():
+        session = Session(client, dc_id, await client.storage.auth_key(), test_mode, is_media=True)
+        await session.start()
+        return session
+
+    session = Session(client, dc_id, await Auth(client, dc_id, test_mode).create(), test_mode, is_media=True)
+    await session.start()
+    for _ in range(3):
+        exported = await client.invoke(raw.functions.auth.ExportAuthorization(dc_id=dc_id))
+        try:
+            await session.invoke(raw.functions.auth.ImportAuthorization(id=exported.id, bytes=exported.bytes))
+        except AuthBytesInvalid:
+            continue
+        return session
+    await session.stop()
+    raise AuthBytesInvalid
+
+
+async def media_sessions(client, dc_id, count):
+    """Up to `count` media sessions to `dc_id`, opened on first use and reused"""
+    async with session_lock:
+        pool = session_pools.setdefault(dc_id, [])
+        while len(pool) < count:
+            pool.append(await start_media_session(client, dc_id))
+        return pool[:count]
+
+
+async def close_media_sessions():
+    for pool in session_pools.values():
+        for session in pool:
+            try:
+                await session.stop()
+            except Exception:
+                pass
+    session_pools.clear()
+
+
+def can_download_parallel(file_size):
+    return Config.DOWNLOAD_PARTS > 1 and bool(file_size) and file_size >= Config.PARALLEL_DOWNLOAD_THRESHOLD
+
+
+def preallocate(fd, size):
+    try:
+        os.posix_fallocate(fd, 0, size)
+    except (AttributeError, OSError):
+        os.ftruncate(fd, size)
+
+
+async def fetch_range(session, location, fd, start, end, on_chunk):
+    """Fetch bytes [start, end) chunk by chunk into `fd`, retrying failed chunks"""
+    offset = start
+    failures = 0
+    while offset < end:
+        try:
+            r = await session.invoke(
+                raw.functions.upload.GetFile(location=location, offset=offset, limit=CHUNK_SIZE),
+                sleep_threshold=30
+            )
+        except FloodWait as e:
+            download_limiter.congestion()
+            await asyncio.sleep(e.value)
+            continue
+        except (OSError, asyncio.TimeoutError, TimeoutError) as e:
+            if isinstance(e, CONGESTION_ERRORS):
+                download_limiter.congestion()
+            failures += 1
+            if failures > Config.TRANSFER_RETRIES:
+                raise
+            await asyncio.sleep(failures)
+            continue
+        if not isinstance(r, raw.types.upload.File):
+            raise Exception("CDN redirects are not supported by the parallel downloader")
+        data = r.bytes
+        if not data:
+            break
+        os.pwrite(fd, data, offset)
+        failures = 0
+        await on_chunk(offset, len(data))
+        offset += len(data)
+        if len(data) < CHUNK_SIZE:
+            break
+    return offset - start
+
+
+def merge_ranges(ranges):
+    """Sort and join overlapping or touching [start, end) ranges"""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def missing_ranges(done, file_size, part_size):
+    """The parts of [0, file_size) not covered by `done`, cut to part_size pieces"""
+    gaps = []
+    position = 0
+    for start, end in merge_ranges(done) + [[file_size, file_size]]:
+        while position < start:
+            gaps.append((position, min(position + part_size, start)))
+            position = gaps[-1][1]
+        position = max(position, end)
+    return gaps
+
+
+class Checkpoint:
+    """Sidecar file listing which byte ranges of a partial download are on disk"""
+
+    def __init__(self, path, key, file_size):
+        self.path = path
+        self.key = key
+        self.file_size = file_size
+        self.done = []
+        self.saved_at = time.monotonic()
+        # Background save in progress, if any
+        self.saving = None
+
+    def load(self, partial):
+        """Resume from an earlier run if the checkpoint matches this file"""
+        try:
+            with open(self.path) as file:
+                data = json.load(file)
+            if (data.get('key') == self.key and data.get('file_size') == self.file_size
+                    and os.path.getsize(partial) == self.file_size):
+                self.done = merge_ranges(data.get('done', []))
+        except (OSError, ValueError, TypeError):
+            self.done = []
+        return sum(end - start for start, end in self.done)
+
+    def add(self, start, end, fd):
+        self.done = merge_ranges(self.done + [[start, end]])
+        if not self.saving and time.monotonic() - self.saved_at >= Config.CHECKPOINT_INTERVAL:
+            # Saved in the background, so the workers never wait on the disk sync
+            self.saving = asyncio.create_task(self.save(fd))
+            self.saving.add_done_callback(self.saved)
+
+    def saved(self, task):
+        self.saving = None
+        if not task.cancelled() and task.exception():
+            print(f"Could not save checkpoint {os.path.basename(self.path)}: {task.exception()}")
+
+    async def save(self, fd):
+        """Sync the partial file in a worker thread, then record the ranges written before the sync"""
+        done = [list(part) for part in self.done]
+        await asyncio.to_thread(self.write, fd, done)
+        self.saved_at = time.monotonic()
+
+    async def flush(self, fd):
+        """Wait for a background save, then save everything written so far"""
+        if self.saving:
+            await asyncio.gather(self.saving, return_exceptions=True)
+        await self.save(fd)
+
+    def write(self, fd, done):
+        # Data first, so the checkpoint never claims bytes that are not on disk
+        os.fdatasync(fd) if hasattr(os, "fdatasync") else os.fsync(fd)
+        temp = self.path + ".tmp"
+        with open(temp, "w") as file:
+            json.dump({'key': self.key, 'file_size': self.file_size, 'done': done}, file)
+        os.replace(temp, self.path)
+
+    def remove(self):
+        for path in (self.path, self.path + ".tmp"):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def discard_partial(media):
+    """Remove the partial download and checkpoint of `media` once the file got
+    here some other way; nothing is left to resume"""
+    key = safe_filename(media.file_unique_id)
+    if key in active_partials:
+        return
+    partial = os.path.join(PARTIAL_DIR, f"{key}.part")
+    for path in (partial, partial + ".json", partial + ".json.tmp"):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+async def parallel_download(client, message, file_type, target, progress=None, progress_args=()):
+    """Download a document, video or audio into `target` over several byte ranges at once
+
+    The file is split into Config.DOWNLOAD_PART_SIZE ranges and
+    Config.DOWNLOAD_PARTS of them are fetched at a time, spread over
+    Config.MEDIA_SESSIONS media sessions, each written at its own offset into
+    a preallocated partial file under downloads/partial/. A checkpoint next
+    to it records the finished ranges, so a retry or a restart of the same
+    file only fetches what is missing. The partial file is moved onto
+    `target` once complete.
+    """
+    media = getattr(message, file_type)
+    file_id = FileId.decode(media.file_id)
+    file_size = media.file_size
+    location = raw.types.InputDocumentFileLocation(
+        id=file_id.media_id,
+        access_hash=file_id.access_hash,
+        file_reference=file_id.file_reference,
+        thumb_size=file_id.thumbnail_size
+    )
+    sessions = await media_sessions(client, file_id.dc_id, max(1, Config.MEDIA_SESSIONS))
+    part_size = max(1, Config.DOWNLOAD_PART_SIZE // CHUNK_SIZE) * CHUNK_SIZE
+
+    expire_partials()
+    os.makedirs(PARTIAL_DIR, exist_ok=True)
+    key = safe_filename(media.file_unique_id)
+    if key in active_partials:
+        key = f"{key}-{os.urandom(4).hex()}"
+    active_partials.add(key)
+    partial = os.path.join(PARTIAL_DIR, f"{key}.part")
+    checkpoint = Checkpoint(partial + ".json", media.file_unique_id, file_size)
+
+    try:
+        done = checkpoint.load(partial)
+        if done:
+            print(f"Resuming {os.path.basename(target)} from {done} of {file_size} bytes")
+        ranges = missing_ranges(checkpoint.done, file_size, part_size)
+        ranges.reverse()
+
+        async def on_chunk(start, nbytes):
+            nonlocal done
+            done += nbytes
+            checkpoint.add(start, start + nbytes, fd)
+            if progress:
+                await progress(min(done, file_size), file_size, *progress_args)
+
+        async def worker(session):
+            while ranges:
+                start, end = ranges.pop()
+                await fetch_range(session, location, fd, start, end, on_chunk)
+
+        fd = os.open(partial, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if not checkpoint.done:
+                # Nothing to resume; drop whatever a stale partial file held
+                os.ftruncate(fd, 0)
+                preallocate(fd, file_size)
+            workers = [
+                asyncio.create_task(worker(sessions[index % len(sessions)]))
+                for index in range(min(Config.DOWNLOAD_PARTS, len(ranges)))
+            ]
+            try:
+                await asyncio.gather(*workers)
+            finally:
+                for task in workers:
+                    task.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+                await checkpoint.flush(fd)
+        finally:
+            os.close(fd)
+
+        if checkpoint.done != [[0, file_size]]:
+            raise Exception(f"Parallel download got {done} of {file_size} bytes")
+        os.replace(partial, target)
+        checkpoint.remove()
+        return target
+    except asyncio.CancelledError:
+        # Cancelled by the user, there is nothing to come back for
+        checkpoint.remove()
+        try:
+            os.remove(partial)
+        except OSError:
+            pass
+        raise
+    finally:
+        active_partials.discard(key)
+
+
+def can_upload_parallel(file_size):
+    return Config.UPLOAD_PARTS > 1 and bool(file_size) and file_size > BIG_FILE_SIZE
+
+
+async def parallel_upload(client, path, progress=None, progress_args=()):
+    """Upload a local file as big-file parts, Config.UPLOAD_PARTS at a time
+
+    Parts are read from one shared mmap of the file and sent over the media
+    session pool of our own DC. A part that fails goes back in the queue
+    (possibly to another session) up to Config.TRANSFER_RETRIES times, the
+    parts already stored stay stored. Returns the InputFileBig to send.
+    """
+    file_size = os.path.getsize(path)
+    total_parts = (file_size + UPLOAD_PART_SIZE - 1) // UPLOAD_PART_SIZE
+    file_id = int.from_bytes(os.urandom(8), "big", signed=True)
+    sessions = await media_sessions(client, await client.storage.dc_id(), max(1, Config.MEDIA_SESSIONS))
+    pending = deque(range(total_parts))
+    failures = {}
+    done = 0
+
+    async def send_part(session, view, part):
+        nonlocal done
+        data = view[part * UPLOAD_PART_SIZE:(part + 1) * UPLOAD_PART_SIZE]
+        started = time.monotonic()
+        try:
+            ok = await session.invoke(
+                raw.functions.upload.SaveBigFilePart(
+                    file_id=file_id, file_part=part, file_total_parts=total_parts, bytes=data
+                ),
+                sleep_threshold=30
+            )
+            if not ok:
+                raise OSError(f"part {part} was not saved")
+        except FloodWait as e:
+            upload_limiter.congestion()
+            pending.append(part)
+            await asyncio.sleep(e.value)
+            return
+        except (OSError, asyncio.TimeoutError, TimeoutError) as e:
+            if isinstance(e, CONGESTION_ERRORS):
+                upload_limiter.congestion()
+            failures[part] = failures.get(part, 0) + 1
+            upload_stats['retries'] += 1
+            if failures[part] > Config.TRANSFER_RETRIES:
+                raise
+            pending.append(part)
+            await asyncio.sleep(failures[part])
+            return
+        count_part(time.monotonic() - started)
+        done += len(data)
+        if progress:
+            await progress(done, file_size, *progress_args)
+
+    async def worker(session, view):
+        while pending:
+            await send_part(session, view, pending.popleft())
+
+    with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+        if hasattr(view, "madvise"):
+            view.madvise(mmap.MADV_SEQUENTIAL)
+        workers = [
+            asyncio.create_task(worker(sessions[index % len(sessions)], view))
+            for index in range(min(Config.UPLOAD_PARTS, total_parts))
+        ]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    if done != file_size:
+        raise Exception(f"Parallel upload sent {done} of {file_size} bytes")
+    return raw.types.InputFileBig(id=file_id, parts=total_parts, name=os.path.basename(path))
+
+
+def count_part(latency):
+    """Record one uploaded part and how long Telegram took to store it"""
+    upload_stats['parts'] += 1
+    upload_stats['latency_total'] += latency
+    upload_stats['latency_max'] = max(upload_stats['latency_max'], latency)
+
+
+def get_upload_stats():
+    parts = upload_stats['parts']
+    return dict(upload_stats, latency_avg=upload_stats['latency_total'] / parts if parts else 0.0)
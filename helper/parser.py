@@ -0,0 +1,695 @@
+import os
+import re
+import time
+import asyncio
+import logging
+import multiprocessing
+from collections import namedtuple, Counter
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# ORIGINAL EPISODE PATTERNS
+# Pattern 1: S01E02 or S01EP02
+pattern1 = re.compile(r'S(\d+)(?:E|EP)(\d+)')
+# Pattern 2: S01 E02 or S01 EP02 or S01 - E01 or S01 - EP02
+pattern2 = re.compile(r'S(\d+)\s*(?:E|EP|-\s*EP)(\d+)')
+# Pattern 3: Episode Number After "E" or "EP"
+# (was [([<{]?\s*(?:E|EP)\s*(\d+)\s*[)\]>}]?; the optional parts around it
+# never change which number is found, and without them re can skip to an "E")
+pattern3 = re.compile(r'EP?\s*(\d+)')
+# Pattern 3_2: episode number after - [hyphen] (was \s*-\s*(\d+)\s*, same reasoning)
+pattern3_2 = re.compile(r'-\s*(\d+)')
+# Pattern 4: S2 09 ex.
+pattern4 = re.compile(r'S(\d+)[^\d]*(\d+)', re.IGNORECASE)
+# Pattern X: Standalone Episode Number
+patternX = re.compile(r'(\d+)')
+# Pattern Y: Any number in filename (fallback)
+patternY = re.compile(r'[^\d]*(\d+)[^\d]*', re.IGNORECASE)
+
+# NEW EPISODE PATTERNS (30+ additional patterns)
+# Pattern 11: Episode with dots (Episode.01, Ep.02)
+pattern11 = re.compile(r'(?:Episode|Ep)\.(\d+)', re.IGNORECASE)
+
+# Pattern 12: Episode with underscores (Episode_01, Ep_02)
+pattern12 = re.compile(r'(?:Episode|Ep)_(\d+)', re.IGNORECASE)
+
+# Pattern 13: Episode in brackets [01], [Episode 01]
+pattern13 = re.compile(r'\[(?:Episode\s*)?(\d+)\]', re.IGNORECASE)
+
+# Pattern 14: Episode in parentheses (01), (Episode 01)
+pattern14 = re.compile(r'\((?:Episode\s*)?(\d+)\)', re.IGNORECASE)
+
+# Pattern 15: Episode with colon (Episode: 01)
+pattern15 = re.compile(r'Episode:\s*(\d+)', re.IGNORECASE)
+
+# Pattern 16: Two digit episodes (01, 02, 99)
+pattern16 = re.compile(r'\b(\d{2})\b')
+
+# Pattern 17: Three digit episodes (001, 002, 999)
+pattern17 = re.compile(r'\b(\d{3})\b')
+
+# Pattern 18: Episode with 'of' (01 of 12, 1 of 24)
+pattern18 = re.compile(r'(\d+)\s*of\s*\d+', re.IGNORECASE)
+
+# Pattern 19: Episode number after series name
+pattern19 = re.compile(r'[A-Za-z\s]+(\d+)(?:\s*$|\s*\[)', re.IGNORECASE)
+
+# Pattern 20: Episode with 'Part' (Part 1, Part 01)
+pattern20 = re.compile(r'Part\s*(\d+)', re.IGNORECASE)
+
+# Pattern 21: Episode with 'Chapter' (Chapter 1, Ch 01)
+pattern21 = re.compile(r'(?:Chapter|Ch)\s*(\d+)', re.IGNORECASE)
+
+# Pattern 22: Episode with '#' (#01, #1)
+pattern22 = re.compile(r'#(\d+)')
+
+# Pattern 23: Episode with 'x' separator (1x01, 2x05)
+pattern23 = re.compile(r'\d+x(\d+)', re.IGNORECASE)
+
+# Pattern 24: Episode in curly braces {01}, {Episode 01}
+pattern24 = re.compile(r'\{(?:Episode\s*)?(\d+)\}', re.IGNORECASE)
+
+# Pattern 25: Episode with 'Vol' (Vol 1, Volume 01)
+pattern25 = re.compile(r'(?:Vol|Volume)\s*(\d+)', re.IGNORECASE)
+
+# Pattern 26: Episode after hyphen (Series - 01, Name - Episode 1)
+pattern26 = re.compile(r'-\s*(?:Episode\s*)?(\d+)', re.IGNORECASE)
+
+# Pattern 27: Episode after underscore (Series_01, Name_Episode_1)
+pattern27 = re.compile(r'_(?:Episode_)?(\d+)', re.IGNORECASE)
+
+# Pattern 28: Episode with leading zeros (001, 0001)
+pattern28 = re.compile(r'\b0+(\d+)\b')
+
+# Pattern 29: Episode with roman numerals (I, II, III, IV, V)
+# (the lookahead only lets re skip words that can't be one of them)
+pattern29 = re.compile(r'\b(?=[ivx])(I|II|III|IV|V|VI|VII|VIII|IX|X|XI|XII)\b', re.IGNORECASE)
+
+# Pattern 30: Episode spelled out (One, Two, Three, etc.)
+pattern30 = re.compile(r'\b(?=[otfsen])(One|Two|Three|Four|Five|Six|Seven|Eight|Nine|Ten|Eleven|Twelve|Thirteen|Fourteen|Fifteen|Sixteen|Seventeen|Eighteen|Nineteen|Twenty)\b', re.IGNORECASE)
+
+# Pattern 31: Episode with 'No' (No.1, No.01, Number 1)
+pattern31 = re.compile(r'(?:No|Number)\.?\s*(\d+)', re.IGNORECASE)
+
+# Pattern 32: Episode between pipes (|01|, |Episode 1|)
+pattern32 = re.compile(r'\|(?:Episode\s*)?(\d+)\|', re.IGNORECASE)
+
+# Pattern 33: Episode with asterisks (*01*, *Episode 1*)
+pattern33 = re.compile(r'\*(?:Episode\s*)?(\d+)\*', re.IGNORECASE)
+
+# Pattern 34: Episode with plus signs (+01+, +Episode 1+)
+pattern34 = re.compile(r'\+(?:Episode\s*)?(\d+)\+', re.IGNORECASE)
+
+# Pattern 35: Episode with equals (=01=, =Episode 1=)
+pattern35 = re.compile(r'=(?:Episode\s*)?(\d+)=', re.IGNORECASE)
+
+# Pattern 36: Episode at the end of filename
+pattern36 = re.compile(r'(\d+)(?:\.[a-zA-Z0-9]+)?$')
+
+# Pattern 37: Episode with 'Ep' followed by space and number
+pattern37 = re.compile(r'Ep\s+(\d+)', re.IGNORECASE)
+
+# Pattern 38: Episode with 'Episode' followed by space and number
+pattern38 = re.compile(r'Episode\s+(\d+)', re.IGNORECASE)
+
+# Pattern 39: Multiple episodes (01-02, 1&2, 1+2)
+pattern39 = re.compile(r'(\d+)[-&+](\d+)')
+
+# Pattern 40: Episode with special anime numbering (001.5, 12.5)
+pattern40 = re.compile(r'(\d+)\.5')
+
+# Pattern 41: OVA/OAD numbering (OVA 1, OAD 01)
+pattern41 = re.compile(r'(?:OVA|OAD)\s*(\d+)', re.IGNORECASE)
+
+# Pattern 42: Special episodes (SP1, Special 01)
+pattern42 = re.compile(r'(?:SP|Special)\s*(\d+)', re.IGNORECASE)
+
+# QUALITY TOKENS
+# Whole words (the same runs of \w that \b sees) that name a quality, by
+# quality rule id
+QUALITY_TOKENS = {
+    # Pattern 11: Standard quality formats
+    '480p': '11', '576p': '11', '720p': '11', '1080p': '11',
+    '1440p': '11', '2160p': '11', '4320p': '11',
+    # Pattern 13: BluRay indicators
+    'bluray': '13', 'bdrip': '13', 'bd': '13', 'brrip': '13',
+    # Pattern 14: Web quality
+    'webrip': '14', 'web-dl': '14', 'web': '14',
+    # Pattern 15: TV quality
+    'tvrip': '15', 'hdtv': '15', 'sdtv': '15',
+    # Pattern 16: CAM/TS quality
+    'cam': '16', 'ts': '16', 'tc': '16', 'scr': '16',
+    # Pattern 17: DVD quality
+    'dvdrip': '17', 'dvd': '17',
+}
+
+# Source rules in priority order
+SOURCE_RULES = ['13', '14', '15', '16', '17']
+
+
+def word_scanner(words, rules):
+    """One case-insensitive regex finding any of `words` (word -> rule id) as
+    whole words, with one group per rule so match.lastindex names the rule"""
+    groups = [
+        "(" + "|".join(re.escape(word) for word, rule_id in words.items() if rule_id == rule) + ")"
+        for rule in rules
+    ]
+    return re.compile(r"\b(?:" + "|".join(groups) + r")\b", re.IGNORECASE)
+
+
+def word_trie(words, fragments=None, anchored=False):
+    """Regex source matching any of `words`, with shared prefixes merged so
+    each position is tried against one branch per first character
+
+    `fragments` maps placeholder characters to regex source. With `anchored`
+    every branch starts with its plain first character followed by a
+    lookbehind standing in for a leading \\b: a pattern that starts with
+    literals lets re jump straight to the characters that could begin a word.
+    """
+    fragments = fragments or {}
+    root = {}
+    for word in words:
+        node = root
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def branch(node, first):
+        branches = []
+        for char, child in sorted(node.items()):
+            if char:
+                head = fragments.get(char) or re.escape(char)
+                if first and anchored:
+                    head += r'(?<!\w.)'
+                branches.append(head + branch(child, False))
+        if not branches:
+            return ''
+        if len(branches) == 1 and '' not in node:
+            return branches[0]
+        return '(?:' + '|'.join(branches) + ')' + ('?' if '' in node else '')
+
+    return branch(root, True)
+
+
+# Pattern 11: Standard quality formats, looked for first; most names carry one.
+# They all start with a digit, which IGNORECASE leaves a plain literal.
+resolution_words = [word for word, rule_id in QUALITY_TOKENS.items() if rule_id == '11']
+pattern11_q = re.compile("(" + word_trie(resolution_words, anchored=True) + r")\b", re.IGNORECASE)
+# Pattern 12: Quality with brackets [720p], (1080p)
+pattern12_q = re.compile(r'[([<{]\s*(\d{3,4}p)\s*[)\]>}]', re.IGNORECASE)
+# Pattern 13-17: every source word in a single scan
+source_scan = word_scanner(QUALITY_TOKENS, SOURCE_RULES)
+
+# Pattern 6-8: markers that match anywhere in the name, in priority order.
+# 4kX264 / 4kx265 (old patterns 9 and 10) always contain "4k", so they never
+# won over Pattern 6 and are not listed.
+QUALITY_MARKERS = [('6', '4k', '4k'), ('7', '2k', '2k'), ('8', 'hdrip', 'HdRip')]
+
+# re.IGNORECASE compares "İ" with "i", casefold() would expand it instead
+fold_table = {0x130: 'i'}
+
+long_digit_run = re.compile(r'\d{3,}')
+digit_or_p = re.compile(r'[\dpP]')
+
+# RELEASE TAG TOKENS
+# Whole words of the lowercased name: (field, value to show)
+TAG_TOKENS = {
+    # Video codec
+    'x264': ('codec', 'x264'), 'x265': ('codec', 'x265'),
+    'h264': ('codec', 'H.264'), 'h265': ('codec', 'H.265'),
+    'avc': ('codec', 'AVC'), 'hevc': ('codec', 'HEVC'), 'av1': ('codec', 'AV1'),
+    'vp9': ('codec', 'VP9'), 'xvid': ('codec', 'XviD'), 'divx': ('codec', 'DivX'),
+    # Audio
+    'aac': ('audio', 'AAC'), 'flac': ('audio', 'FLAC'), 'opus': ('audio', 'OPUS'),
+    'mp3': ('audio', 'MP3'), 'ac3': ('audio', 'AC3'), 'eac3': ('audio', 'EAC3'),
+    'dts': ('audio', 'DTS'), 'truehd': ('audio', 'TrueHD'), 'atmos': ('audio', 'Atmos'),
+    'dd': ('audio', 'DD'), 'ddp': ('audio', 'DDP'),
+    # Languages and subtitles
+    'eng': ('language', 'ENG'), 'english': ('language', 'ENG'),
+    'jap': ('language', 'JPN'), 'jpn': ('language', 'JPN'), 'japanese': ('language', 'JPN'),
+    'hin': ('language', 'HIN'), 'hindi': ('language', 'HIN'),
+    'tam': ('language', 'TAM'), 'tamil': ('language', 'TAM'),
+    'tel': ('language', 'TEL'), 'telugu': ('language', 'TEL'),
+    'kor': ('language', 'KOR'), 'korean': ('language', 'KOR'),
+    'chi': ('language', 'CHI'), 'chinese': ('language', 'CHI'),
+    'spa': ('language', 'SPA'), 'spanish': ('language', 'SPA'),
+    'fre': ('language', 'FRE'), 'french': ('language', 'FRE'),
+    'ger': ('language', 'GER'), 'german': ('language', 'GER'),
+    'ita': ('language', 'ITA'), 'italian': ('language', 'ITA'),
+    'rus': ('language', 'RUS'), 'russian': ('language', 'RUS'),
+    'esub': ('language', 'ESub'), 'esubs': ('language', 'ESub'),
+    'msub': ('language', 'MSub'), 'msubs': ('language', 'MSub'),
+}
+
+# Tags written as two tokens with one separator between them (H.264, Dual Audio)
+TAG_PAIRS = {
+    ('h', '264'): ('codec', 'H.264'), ('h', '265'): ('codec', 'H.265'),
+    ('dual', 'audio'): ('audio', 'Dual Audio'), ('multi', 'audio'): ('audio', 'Multi Audio'),
+    ('multi', 'sub'): ('language', 'Multi-Sub'), ('multi', 'subs'): ('language', 'Multi-Sub'),
+}
+
+# Every tag and the Pattern 11 words in one scan of a copy of the name where
+# each byte that isn't an ASCII word character is a space, lowercased and with
+# a space put in front. bytes.translate makes that copy in C, and with every
+# hit starting at a literal space re jumps from one separator to the next,
+# then takes one branch per first character: a channel count may follow an
+# audio word (AAC2.0, DDP5.1, "#" below) and pairs have exactly one
+# separator between their words (" ").
+separator_table = bytes(
+    byte if chr(byte).isascii() and (chr(byte).isalnum() or chr(byte) == '_') else ord(' ')
+    for byte in range(256)
+)
+tag_words = [
+    word + '#' if field == 'audio' and not word[-1].isdigit() else word
+    for word, (field, _) in TAG_TOKENS.items()
+] + [first + ' ' + second for first, second in TAG_PAIRS]
+tag_scan = re.compile(
+    (" (" + word_trie(resolution_words + tag_words, {'#': '[0-9]*', ' ': ' '}) + r")(?!\w)").encode()
+)
+crc32_tag = re.compile(rb'[\[(]([0-9A-Fa-f]{8})[\])]')
+# Words that name a quality or a tag, never a release group
+not_group_words = {
+    *TAG_TOKENS,
+    *(part for word in QUALITY_TOKENS for part in word.split('-')),
+    *(word for pair in TAG_PAIRS for word in pair),
+}
+
+# [SubsPlease] Show - 01.mkv  /  Show.S01E01.1080p.WEB-DL.x264-GROUP.mkv
+leading_group = re.compile(r'\s*\[([^\]]+)\]')
+trailing_group = re.compile(r'-([A-Za-z][A-Za-z0-9]*)(?:\.\w+)?$')
+
+# Roman numeral conversion dictionary
+roman_dict = {
+    'I': '1', 'II': '2', 'III': '3', 'IV': '4', 'V': '5',
+    'VI': '6', 'VII': '7', 'VIII': '8', 'IX': '9', 'X': '10',
+    'XI': '11', 'XII': '12'
+}
+
+# Spelled number conversion dictionary
+word_dict = {
+    'one': '1', 'two': '2', 'three': '3', 'four': '4', 'five': '5',
+    'six': '6', 'seven': '7', 'eight': '8', 'nine': '9', 'ten': '10',
+    'eleven': '11', 'twelve': '12', 'thirteen': '13', 'fourteen': '14',
+    'fifteen': '15', 'sixteen': '16', 'seventeen': '17', 'eighteen': '18',
+    'nineteen': '19', 'twenty': '20'
+}
+
+# Episode rules in priority order: (rule id, pattern, episode group, season group)
+# The first rule that matches anywhere wins, so match_episode tries them in
+# turn. One combined regex would still have to scan once per rule to keep
+# this priority, and would lose the prefix scans re does for each pattern.
+EPISODE_RULES = [
+    ("1", pattern1, 2, 1),
+    ("2", pattern2, 2, 1),
+    ("3", pattern3, 1, None),
+    ("3_2", pattern3_2, 1, None),
+    ("4", pattern4, 2, 1),
+    ("11", pattern11, 1, None),
+    ("12", pattern12, 1, None),
+    ("13", pattern13, 1, None),
+    ("14", pattern14, 1, None),
+    ("15", pattern15, 1, None),
+    ("18", pattern18, 1, None),
+    ("20", pattern20, 1, None),
+    ("21", pattern21, 1, None),
+    ("22", pattern22, 1, None),
+    ("23", pattern23, 1, None),
+    ("24", pattern24, 1, None),
+    ("25", pattern25, 1, None),
+    ("26", pattern26, 1, None),
+    ("27", pattern27, 1, None),
+    ("28", pattern28, 1, None),
+    ("29", pattern29, 1, None),
+    ("30", pattern30, 1, None),
+    ("31", pattern31, 1, None),
+    ("32", pattern32, 1, None),
+    ("33", pattern33, 1, None),
+    ("34", pattern34, 1, None),
+    ("35", pattern35, 1, None),
+    ("37", pattern37, 1, None),
+    ("38", pattern38, 1, None),
+    ("39", pattern39, 1, None),
+    ("40", pattern40, 1, None),
+    ("41", pattern41, 1, None),
+    ("42", pattern42, 1, None),
+    ("17", pattern17, 1, None),
+    ("16", pattern16, 1, None),
+    ("36", pattern36, 1, None),
+    ("X", patternX, 1, None),
+    ("Y", patternY, 1, None),
+]
+
+
+# A range is a second number glued to the winning one: 05-06, 05&06, 05+06,
+# E05-E06. Whichever rule won, the other number is straight after it or
+# within a few characters before it. Not when letters follow (05-10bit) or
+# spaces come between (Kaiju No 8 - 10).
+range_after = re.compile(r'[-&+](?:EP?)?(\d{1,4})(?![\dA-Za-z])', re.IGNORECASE)
+range_before = re.compile(r'(?<![\dA-Za-z])(?:EP?)?(\d{1,4})[-&+](?:EP?)?$', re.IGNORECASE)
+
+# Pattern 41/42 number OVA/OAD and special episodes
+SPECIAL_RULES = {"41", "42"}
+
+# ".5" straight after the episode number (12.5), as in Pattern 40
+half_episode = re.compile(r'\.5(?!\d)')
+
+# Season markers looked for when the winning episode rule has no season
+# group: "S2 - 03", "Show.S02.E01", "Season 2 Episode 1"
+season_marker = re.compile(r'(?<![A-Za-z0-9])(?:S|Season[\s._-]*)(\d{1,2})(?!\d)', re.IGNORECASE)
+# Pattern 23 (2x05) carries the season in front of the "x"
+season_by_x = re.compile(r'(?<!\d)(\d{1,2})x\d+', re.IGNORECASE)
+
+
+def find_season(filename, rule_id):
+    """Season from a separate scan of the name, or None if it has no marker"""
+    match = season_by_x.search(filename) if rule_id == "23" else None
+    match = match or season_marker.search(filename)
+    return match.group(1) if match else None
+
+
+def episode_range(filename, start, end, value):
+    """``(first, last)`` of a range around the episode at filename[start:end]"""
+    match = range_after.match(filename, end)
+    if match and int(match.group(1)) > int(value):
+        return value, match.group(1)
+    match = range_before.search(filename, max(0, start - 8), start)
+    if match and int(match.group(1)) < int(value):
+        return match.group(1), value
+    return None
+
+
+def match_episode(filename):
+    """Return ``(episode, season, rule_id, episode_range, sub_episode)``
+
+    rule_id is None for the "01" default. episode_range is ``(first, last)``
+    when the episode is one end of a range (05-06), and sub_episode is "5"
+    for half episodes, otherwise both are None. The episode itself is what
+    the winning rule found, the last one for "Show 05-06" as before.
+    """
+    for rule_id, pattern, group, season_group in EPISODE_RULES:
+        match = pattern.search(filename)
+        if match:
+            break
+    else:
+        return "01", find_season(filename, None), None, None, None
+    value = match.group(group)
+    season = match.group(season_group) if season_group else find_season(filename, rule_id)
+    if rule_id == "29":
+        return roman_dict.get(value.upper(), "1"), season, rule_id, None, None
+    if rule_id == "30":
+        return word_dict.get(value.lower(), "1"), season, rule_id, None, None
+    start, end = match.span(group)
+    sub_episode = "5" if half_episode.match(filename, end) else None
+    return value, season, rule_id, episode_range(filename, start, end, value), sub_episode
+
+
+def fold(text):
+    """Case-fold text the way re.IGNORECASE compares it"""
+    return text.translate(fold_table).casefold()
+
+
+def match_quality(filename, resolution=None):
+    """Return ``(quality, rule_id)``; rule_id is None for the "720p" default
+
+    Gives the same answer as the old Pattern 11-17, 5-10 cascade. Pattern 11
+    and 12 are one search each, Pattern 13-17 one scan for all source words
+    and Pattern 5 one pass over the digit runs, none of which backtracks, so
+    it stays linear in the name length. `resolution` is the Pattern 11 word
+    match_tags already found ("" for none), which saves that search.
+    """
+    if resolution is None:
+        match = pattern11_q.search(filename)
+        resolution = match.group(1) if match else ""
+    if resolution:
+        return resolution, '11'
+    match = pattern12_q.search(filename)
+    if match:
+        return match.group(1), '12'
+    hits = {}
+    for match in source_scan.finditer(filename):
+        rule_id = SOURCE_RULES[match.lastindex - 1]
+        hits.setdefault(rule_id, match.group())
+        if rule_id == SOURCE_RULES[0]:
+            break
+    for rule_id in SOURCE_RULES:
+        if rule_id in hits:
+            return hits[rule_id], rule_id
+    # Pattern 5: last 3-4 digits of a run, then anything up to the next "p"
+    # provided no digit comes first (1080p, 720 p, 480_P). Each search stops
+    # at the next digit run at the latest, so this is one pass over the name.
+    for run in long_digit_run.finditer(filename):
+        follow = digit_or_p.search(filename, run.end())
+        if follow is None:
+            break
+        if follow.group() in 'pP':
+            return filename[max(run.start(), run.end() - 4):follow.end()], '5'
+    folded = fold(filename)
+    for rule_id, marker, quality in QUALITY_MARKERS:
+        if marker in folded:
+            return quality, rule_id
+    return "720p", None
+
+
+def tag_value(word):
+    """(field, value) of a tag word tag_scan found"""
+    return (
+        TAG_TOKENS.get(word)
+        or TAG_TOKENS.get(word.rstrip('0123456789'))
+        or TAG_PAIRS.get(tuple(word.split(' ', 1)))
+    )
+
+
+def match_tags(filename):
+    """Return ``(codec, audio, language, group, crc, resolution)`` from one scan
+
+    codec is the first codec seen; audio and language join every distinct
+    tag in order ("AAC Dual Audio", "JPN ENG ESub"). Missing fields are "".
+    resolution is the first Pattern 11 word, "" if there is none, or None when
+    the scan can't vouch for it and match_quality has to look itself: only in
+    an ASCII name does the scan see the words re.IGNORECASE and \\b see.
+    """
+    raw = filename.encode('utf-8', 'replace')
+    codec = crc = group = resolution = ""
+    audio, language = [], []
+    for word in tag_scan.findall(b" " + raw.lower().translate(separator_table)):
+        word = word.decode()
+        # Tags start with a letter, the Pattern 11 words with a digit
+        if word[0].isdigit():
+            resolution = resolution or word
+            continue
+        field, value = tag_value(word)
+        if field == 'codec':
+            codec = codec or value
+        elif field == 'audio':
+            if value not in audio:
+                audio.append(value)
+        elif value not in language:
+            language.append(value)
+    # The scan lowercased it, so it is only as written if "1080P" isn't there
+    if not filename.isascii() or resolution and resolution[:-1] + 'P' in filename:
+        resolution = None
+
+    match = crc32_tag.search(raw)
+    if match:
+        crc = match.group(1).decode().upper()
+    match = leading_group.match(filename)
+    if match:
+        group = match.group(1).strip()
+        if group.upper() == crc or group.lower() in not_group_words:
+            group = ""
+    if not group:
+        match = trailing_group.search(filename)
+        if match and match.group(1).lower() not in not_group_words:
+            group = match.group(1)
+
+    return codec, " ".join(audio), " ".join(language), group, crc, resolution
+
+
+def extract_quality(filename):
+    return parse_filename(filename).quality
+
+
+def extract_episode_number(filename):
+    return parse_filename(filename).episode
+
+
+# Parsed form of a filename, computed once per name and shared by every stage
+ParsedName = namedtuple("ParsedName", [
+    "season", "episode", "quality", "extension", "rule", "quality_rule",
+    "episode_range", "sub_episode", "special",
+    "codec", "audio", "language", "group", "crc",
+])
+
+# Parser counters, shown by the admin /stats command
+parser_stats = {
+    'episode_hits': Counter(),
+    'quality_hits': Counter(),
+    'episode_defaults': 0,
+    'quality_defaults': 0,
+    'parse_time': 0.0,
+}
+
+# Process pool for very large batches, created on first use
+parse_pool = None
+# Pool results on their way into the memo: filename -> (ParsedName, seconds)
+pool_results = {}
+
+
+def build_parsed_name(filename):
+    episode, season, rule_id, episode_range, sub_episode = match_episode(filename)
+    codec, audio, language, group, crc, resolution = match_tags(filename)
+    quality, quality_rule = match_quality(filename, resolution)
+    _, extension = os.path.splitext(filename)
+    return ParsedName(
+        season, episode, quality, extension, rule_id, quality_rule,
+        episode_range, sub_episode, rule_id in SPECIAL_RULES,
+        codec, audio, language, group, crc,
+    )
+
+
+def record_parse(filename, parsed, elapsed):
+    if parsed.rule is None:
+        parser_stats['episode_defaults'] += 1
+    else:
+        parser_stats['episode_hits'][parsed.rule] += 1
+    if parsed.quality_rule is None:
+        parser_stats['quality_defaults'] += 1
+    else:
+        parser_stats['quality_hits'][parsed.quality_rule] += 1
+    parser_stats['parse_time'] += elapsed
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("%r: episode %s (pattern %s), quality %s (pattern %s)",
+                     filename, parsed.episode, parsed.rule or "default",
+                     parsed.quality, parsed.quality_rule or "default")
+
+
+@lru_cache(maxsize=4096)
+def parse_filename(filename):
+    """Parse a filename into a ParsedName (memoized across users)"""
+    seeded = pool_results.pop(filename, None)
+    if seeded:
+        parsed, elapsed = seeded
+    else:
+        started = time.perf_counter()
+        parsed = build_parsed_name(filename)
+        elapsed = time.perf_counter() - started
+    record_parse(filename, parsed, elapsed)
+    return parsed
+
+
+def sort_key(parsed, arrival):
+    """Composite queue order: season, episode, half episode, OVA/SP, arrival
+
+    Names without a season marker sort as season 1, and ranges (01-02) by
+    their first episode.
+    """
+    try:
+        season = int(parsed.season) if parsed.season else 1
+        episode = int(parsed.episode_range[0] if parsed.episode_range else parsed.episode)
+    except ValueError:
+        return (float('inf'), float('inf'), 0, parsed.special, arrival)
+    return (season, episode, int(parsed.sub_episode or 0), parsed.special, arrival)
+
+
+def determine_file_type(file_extension):
+    """Determine if file should be treated as video, audio, or document based on extension"""
+    video_extensions = [
+        '.mp4', '.mkv', '.avi', '.mov', '.wmv', '.flv', '.webm', '.m4v', 
+        '.3gp', '.ts', '.mpg', '.mpeg', '.rm', '.rmvb', '.asf', '.divx',
+        '.xvid', '.f4v', '.m2ts', '.mts', '.vob', '.ogv', '.mxf', '.qt'
+    ]
+    audio_extensions = [
+        '.mp3', '.flac', '.wav', '.aac', '.ogg', '.wma', '.m4a', '.opus',
+        '.ape', '.ac3', '.dts', '.amr', '.ra', '.au', '.aiff', '.caf'
+    ]
+    
+    file_extension = file_extension.lower()
+    
+    if file_extension in video_extensions:
+        return "video"
+    elif file_extension in audio_extensions:
+        return "audio"
+    else:
+        return "document"
+
+
+def parse_chunk(filenames):
+    """Process pool worker: parse a chunk, return results and time spent"""
+    started = time.perf_counter()
+    results = [build_parsed_name(filename) for filename in filenames]
+    return results, time.perf_counter() - started
+
+
+async def parse_filenames(filenames):
+    """Parse many filenames without stalling the event loop
+
+    Small lists are parsed inline through the memo. Above
+    Config.PARSE_POOL_THRESHOLD unique names, chunks are sent to a process
+    pool and awaited. The results then go through parse_filename, which
+    stores them in the memo and counts them in parser_stats.
+    """
+    global parse_pool
+    unique = list(dict.fromkeys(filenames))
+    if len(unique) < Config.PARSE_POOL_THRESHOLD:
+        return [parse_filename(filename) for filename in filenames]
+
+    if parse_pool is None:
+        parse_pool = ProcessPoolExecutor(max_workers=Config.PARSE_POOL_WORKERS, mp_context=pool_context())
+    loop = asyncio.get_running_loop()
+    size = Config.PARSE_CHUNK_SIZE
+    chunks = [unique[i:i + size] for i in range(0, len(unique), size)]
+    done = await asyncio.gather(*[
+        loop.run_in_executor(parse_pool, parse_chunk, chunk) for chunk in chunks
+    ])
+
+    for chunk, (results, elapsed) in zip(chunks, done):
+        for filename, result in zip(chunk, results):
+            pool_results[filename] = (result, elapsed / len(chunk))
+    try:
+        return [parse_filename(filename) for filename in filenames]
+    finally:
+        # Names that were already memoized never picked up their pool result
+        for filename in unique:
+            pool_results.pop(filename, None)
+
+
+def pool_context():
+    """Start pool workers without fork(): the bot process has event loop and
+    to_thread worker threads, and forking those can deadlock the child"""
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def close_parse_pool():
+    global parse_pool
+    if parse_pool is not None:
+        parse_pool.shutdown(wait=False, cancel_futures=True)
+        parse_pool = None
+
+
+def get_parser_stats():
+    """Snapshot of the parser counters plus memo hits/misses"""
+    cache = parse_filename.cache_info()
+    return {
+        'episode_hits': dict(parser_stats['episode_hits']),
+        'quality_hits': dict(parser_stats['quality_hits']),
+        'episode_defaults': parser_stats['episode_defaults'],
+        'quality_defaults': parser_stats['quality_defaults'],
+        'parse_time': parser_stats['parse_time'],
+        'memo_hits': cache.hits,
+        'memo_misses': cache.misses,
+    }
+
+
+def reset_parser_stats():
+    """Zero the counters and drop the memo so its hit/miss count restarts"""
+    parser_stats['episode_hits'].clear()
+    parser_stats['quality_hits'].clear()
+    parser_stats['episode_defaults'] = 0
+    parser_stats['quality_defaults'] = 0
+    parser_stats['parse_time'] = 0.0
+    parse_filename.cache_clear()
@@ -0,0 +1,76 @@
+import os, mmap, asyncio
+from collections import OrderedDict
+from hachoir.core import config as hachoir_config
+from hachoir.metadata import extractMetadata
+from hachoir.parser import createParser
+
+# hachoir warns about every field it can't make sense of
+hachoir_config.quiet = True
+
+# Probed metadata by file_unique_id; the bytes behind an id never change
+probe_cache = OrderedDict()
+PROBE_CACHE_SIZE = 4096
+probe_stats = {'probes': 0, 'hits': 0, 'failures': 0}
+
+
+def metadata_value(metadata, key):
+    """`key` from the top level of hachoir metadata, or from the first
+    group (video/audio track) that has it, as in MKV and MP4 files"""
+    if metadata.has(key):
+        return metadata.get(key)
+    for group in metadata.iterGroups() if hasattr(metadata, "iterGroups") else ():
+        if group.has(key):
+            return group.get(key)
+    return None
+
+
+def read_media_info(path):
+    """Duration in seconds, width and height of a media file ({} if unknown)
+
+    The file is mapped instead of read, so only the pages the parser
+    touches (the container header and index) come off the disk.
+    """
+    info = {}
+    try:
+        with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            parser = createParser(view, real_filename=os.path.basename(path))
+            if not parser:
+                return info
+            with parser:
+                metadata = extractMetadata(parser)
+    except Exception as e:
+        print(f"Could not probe {os.path.basename(path)}: {e}")
+        probe_stats['failures'] += 1
+        return info
+    if not metadata:
+        return info
+    duration = metadata_value(metadata, "duration")
+    if duration:
+        info['duration'] = int(duration.total_seconds())
+    for key in ("width", "height"):
+        value = metadata_value(metadata, key)
+        if value:
+            info[key] = int(value)
+    return info
+
+
+async def probe_media(path, media=None):
+    """Duration, width and height to send `path` with
+
+    The file is probed in a worker thread, once per file_unique_id of the
+    Telegram `media` it came from. Whatever the probe can't tell is taken
+    from `media` itself.
+    """
+    key = getattr(media, "file_unique_id", None)
+    info = probe_cache.get(key) if key else None
+    if info is not None:
+        probe_cache.move_to_end(key)
+        probe_stats['hits'] += 1
+    else:
+        probe_stats['probes'] += 1
+        info = await asyncio.to_thread(read_media_info, path)
+        if key:
+            probe_cache[key] = info
+            if len(probe_cache) > PROBE_CACHE_SIZE:
+                probe_cache.popitem(last=False)
+    return {field: info.get(field) or getattr(media, field, 0) or 0 for field in ("duration", "width", "height")}
@@ -0,0 +1,75 @@
+import time, asyncio
+from pyrogram.errors import FloodWait, MessageNotModified
+from config import Config
+from .scheduler import priority
+
+
+class ProgressReporter:
+    """Coalesce progress edits so each message is edited at most once per interval
+
+    Callers hand over the latest text with report(); one flush task per
+    message sends it once the interval has passed, skipping text that is
+    already shown. A FloodWait on a message waits it out and doubles that
+    message's interval (up to 8x).
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.states = {}
+
+    @staticmethod
+    def key(message):
+        chat = getattr(message, "chat", None)
+        return (getattr(chat, "id", None), getattr(message, "id", None) or id(message))
+
+    def report(self, message, text, reply_markup=None):
+        """Set the text a progress message should show next (does not block)"""
+        key = self.key(message)
+        state = self.states.get(key)
+        if state is None:
+            if len(self.states) > 256:
+                self.prune()
+            state = self.states[key] = {'shown': None, 'next_at': 0, 'interval': self.interval, 'task': None}
+        state.update(message=message, text=text, markup=reply_markup)
+        if state['task'] is None:
+            state['task'] = asyncio.create_task(self.flush(key, state))
+
+    async def flush(self, key, state):
+        try:
+            # Progress edits queue behind interactive replies in the scheduler
+            with priority("progress"):
+                while state['text'] != state['shown']:
+                    delay = state['next_at'] - time.monotonic()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    text = state['text']
+                    try:
+                        await state['message'].edit_text(text, reply_markup=state['markup'])
+                    except FloodWait as e:
+                        state['interval'] = min(state['interval'] * 2, self.interval * 8)
+                        state['next_at'] = time.monotonic() + e.value
+                        continue
+                    except MessageNotModified:
+                        pass
+                    except Exception:
+                        # Message deleted or no longer editable, stop updating it
+                        state['shown'] = state['text']
+                        break
+                    state['shown'] = text
+                    state['next_at'] = time.monotonic() + state['interval']
+        finally:
+            state['task'] = None
+
+    def discard(self, message):
+        """Drop pending updates for a message that is about to be deleted"""
+        state = self.states.pop(self.key(message), None)
+        if state and state['task']:
+            state['task'].cancel()
+
+    def prune(self):
+        now = time.monotonic()
+        for key in [key for key, state in self.states.items() if state['task'] is None and state['next_at'] < now]:
+            del self.states[key]
+
+
+progress_reporter = ProgressReporter(Config.PROGRESS_INTERVAL)
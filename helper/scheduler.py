@@ -0,0 +1,172 @@
+import time, asyncio, itertools
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pyrogram.errors import FloodWait
+from config import Config
+
+# Lower number goes first when several calls are waiting
+PRIORITIES = {"interactive": 0, "progress": 1, "broadcast": 2}
+outbound_priority = ContextVar("outbound_priority", default="interactive")
+
+# Calls that put something into a chat, the ones Telegram rate limits per chat
+SCHEDULED_QUERIES = {
+    "functions.messages.SendMessage",
+    "functions.messages.SendMedia",
+    "functions.messages.SendMultiMedia",
+    "functions.messages.EditMessage",
+    "functions.messages.ForwardMessages",
+}
+
+
+@contextmanager
+def priority(name):
+    """Run the calls made inside this block with another priority class"""
+    token = outbound_priority.set(name)
+    try:
+        yield
+    finally:
+        outbound_priority.reset(token)
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.paused_until = 0
+
+    def wait_time(self, now):
+        """Seconds until a token is available (0 if one is available now)"""
+        if self.paused_until > now:
+            return self.paused_until - now
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return 0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+    def pause(self, seconds):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def idle(self, now):
+        return self.paused_until <= now and self.wait_time(now) == 0 and self.tokens >= self.burst
+
+
+class OutboundScheduler:
+    """Admit outgoing chat calls through a global and a per-chat token bucket
+
+    Waiting calls are granted in priority order (interactive replies, then
+    progress edits, then broadcasts), skipping over calls whose own chat is
+    still out of tokens. A FloodWait pauses only the bucket of the chat that
+    got it, and the call is queued again.
+    """
+
+    def __init__(self):
+        self.global_bucket = TokenBucket(Config.OUTBOUND_GLOBAL_RATE, Config.OUTBOUND_GLOBAL_BURST)
+        self.chat_buckets = {}
+        self.waiting = []
+        self.sequence = itertools.count()
+        self.wakeup = None
+        self.dispatcher = None
+        self.stats = {'granted': 0, 'wait_time': 0.0, 'max_wait': 0.0, 'flood_waits': 0}
+
+    @staticmethod
+    def chat_of(query):
+        """Chat a query is aimed at, or None if it isn't a scheduled call"""
+        if getattr(query, "QUALNAME", None) not in SCHEDULED_QUERIES:
+            return None
+        peer = getattr(query, "peer", None) or getattr(query, "to_peer", None)
+        for field in ("user_id", "chat_id", "channel_id"):
+            value = getattr(peer, field, None)
+            if value is not None:
+                return value
+        return "self"
+
+    def bucket(self, chat):
+        bucket = self.chat_buckets.get(chat)
+        if bucket is None:
+            if len(self.chat_buckets) > 1024:
+                now = time.monotonic()
+                self.chat_buckets = {key: b for key, b in self.chat_buckets.items() if not b.idle(now)}
+            bucket = self.chat_buckets[chat] = TokenBucket(Config.OUTBOUND_CHAT_RATE, Config.OUTBOUND_CHAT_BURST)
+        return bucket
+
+    async def acquire(self, chat):
+        if self.dispatcher is None or self.dispatcher.done():
+            self.wakeup = asyncio.Event()
+            self.dispatcher = asyncio.create_task(self.dispatch())
+        entry = (PRIORITIES.get(outbound_priority.get(), 0), next(self.sequence), chat, time.monotonic(),
+                 asyncio.get_running_loop().create_future())
+        self.waiting.append(entry)
+        self.wakeup.set()
+        try:
+            await entry[4]
+        except asyncio.CancelledError:
+            if entry in self.waiting:
+                self.waiting.remove(entry)
+            raise
+
+    async def dispatch(self):
+        while True:
+            if not self.waiting:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+                continue
+            now = time.monotonic()
+            delay = None
+            self.waiting.sort()
+            for entry in self.waiting:
+                _, _, chat, queued_at, future = entry
+                if future.done():
+                    self.waiting.remove(entry)
+                    break
+                wait = max(self.global_bucket.wait_time(now), self.bucket(chat).wait_time(now))
+                if wait == 0:
+                    self.global_bucket.take()
+                    self.bucket(chat).take()
+                    self.waiting.remove(entry)
+                    waited = now - queued_at
+                    self.stats['granted'] += 1
+                    self.stats['wait_time'] += waited
+                    self.stats['max_wait'] = max(self.stats['max_wait'], waited)
+                    future.set_result(None)
+                    break
+                delay = wait if delay is None else min(delay, wait)
+            else:
+                self.wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def submit(self, chat, call):
+        """Run `call` once the chat may be written to, retrying after FloodWait"""
+        for attempt in range(Config.OUTBOUND_RETRIES + 1):
+            await self.acquire(chat)
+            try:
+                return await call()
+            except FloodWait as e:
+                self.stats['flood_waits'] += 1
+                self.bucket(chat).pause(e.value)
+                if attempt == Config.OUTBOUND_RETRIES:
+                    raise
+
+    def metrics(self):
+        depth = {name: 0 for name in PRIORITIES}
+        names = {value: name for name, value in PRIORITIES.items()}
+        for entry in self.waiting:
+            depth[names[entry[0]]] += 1
+        granted = self.stats['granted']
+        return {
+            'queued': depth,
+            'granted': granted,
+            'avg_wait': self.stats['wait_time'] / granted if granted else 0.0,
+            'max_wait': self.stats['max_wait'],
+            'flood_waits': self.stats['flood_waits'],
+            'paused_chats': sum(1 for b in self.chat_buckets.values() if b.paused_until > time.monotonic()),
+        }
+
+
+outbound_scheduler = OutboundScheduler()
@@ -0,0 +1,142 @@
+import os, re, time, shutil, uuid
+from config import Config
+
+# Every transfer gets downloads/<user_id>/<job_id>/ to itself
+SCRATCH_ROOT = os.path.abspath("downloads")
+# Resumable partial downloads survive restarts here until they expire
+PARTIAL_DIR = os.path.join(SCRATCH_ROOT, "partial")
+# Thumbnails live under downloads/ so the startup sweep clears them with the
+# in-memory index they belong to
+THUMB_DIR = os.path.join(SCRATCH_ROOT, "thumbs")
+
+# Partial files being written right now, so two jobs never share one
+active_partials = set()
+
+unsafe_chars = re.compile(r'[\x00-\x1f/\\]')
+
+
+def safe_filename(name, fallback="file"):
+    """Make a user supplied filename usable as a single path component"""
+    name = unsafe_chars.sub("_", name).strip().lstrip(".")
+    if not name:
+        return fallback
+    # Most filesystems cap a name at 255 bytes; trim the stem, keep the extension
+    root, ext = os.path.splitext(name)
+    while len((root + ext).encode()) > 255 and root:
+        root = root[:-1]
+    return (root + ext) if root else fallback + ext[:16]
+
+
+def new_scratch_dir(user_id):
+    """Path of a fresh scratch directory for one job (created on use)"""
+    return os.path.join(SCRATCH_ROOT, str(user_id), uuid.uuid4().hex[:12])
+
+
+def scratch_target(scratch_dir, filename):
+    """Create the job directory and return the path the download should land on"""
+    os.makedirs(scratch_dir, exist_ok=True)
+    return os.path.join(scratch_dir, safe_filename(filename))
+
+
+def place_download(downloaded_file, target):
+    """Move a finished download onto its target name in place
+
+    download_media returns None instead of raising when the download fails,
+    which would otherwise hand a path that doesn't exist to the upload."""
+    if not downloaded_file or not os.path.exists(downloaded_file):
+        raise Exception(f"Download of {os.path.basename(target)} failed")
+    if downloaded_file != target:
+        os.replace(downloaded_file, target)
+    return target
+
+
+def remove_scratch(scratch_dir):
+    if scratch_dir:
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+
+
+def expire_partials():
+    """Remove partial downloads and checkpoints untouched for Config.PARTIAL_TTL"""
+    freed = 0
+    if not os.path.isdir(PARTIAL_DIR):
+        return freed
+    cutoff = time.time() - Config.PARTIAL_TTL
+    for entry in os.scandir(PARTIAL_DIR):
+        try:
+            stat = entry.stat(follow_symlinks=False)
+            if stat.st_mtime < cutoff:
+                os.remove(entry.path)
+                freed += stat.st_size
+        except OSError:
+            pass
+    return freed
+
+
+def allocated_size(stat):
+    """Bytes a file really takes on disk: preallocated space counts, holes don't"""
+    return stat.st_blocks * 512 if hasattr(stat, "st_blocks") else stat.st_size
+
+
+def is_idle_partial(root, name):
+    """A partial download or checkpoint in PARTIAL_DIR that no job is writing"""
+    return root == PARTIAL_DIR and name.split(".part")[0] not in active_partials
+
+
+def scratch_usage():
+    """Bytes in downloads/: (written by running jobs, held by idle partial downloads)
+
+    The thumbnail cache has its own budget and is left out."""
+    written = idle = 0
+    for root, dirs, files in os.walk(SCRATCH_ROOT):
+        if root == SCRATCH_ROOT:
+            dirs[:] = [name for name in dirs if os.path.join(root, name) != THUMB_DIR]
+        for name in files:
+            try:
+                size = allocated_size(os.stat(os.path.join(root, name), follow_symlinks=False))
+            except OSError:
+                continue
+            if is_idle_partial(root, name):
+                idle += size
+            else:
+                written += size
+    return written, idle
+
+
+def drop_idle_partials():
+    """Remove partial downloads no job is writing, returns bytes freed"""
+    freed = 0
+    if not os.path.isdir(PARTIAL_DIR):
+        return freed
+    for entry in os.scandir(PARTIAL_DIR):
+        if not is_idle_partial(PARTIAL_DIR, entry.name):
+            continue
+        try:
+            size = allocated_size(entry.stat(follow_symlinks=False))
+            os.remove(entry.path)
+            freed += size
+        except OSError:
+            pass
+    return freed
+
+
+def sweep_scratch():
+    """Remove whatever a previous run left in downloads/, returns bytes freed
+
+    Partial downloads are kept so the job can resume, unless they expired."""
+    freed = expire_partials()
+    if not os.path.isdir(SCRATCH_ROOT):
+        return freed
+    for entry in os.scandir(SCRATCH_ROOT):
+        if entry.path == PARTIAL_DIR:
+            continue
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                for root, _, files in os.walk(entry.path):
+                    freed += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+                shutil.rmtree(entry.path, ignore_errors=True)
+            else:
+                freed += entry.stat(follow_symlinks=False).st_size
+                os.remove(entry.path)
+        except OSError:
+            pass
+    return freed
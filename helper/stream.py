@@ -0,0 +1,187 @@
+import os, time, asyncio, hashlib, mimetypes
+from pyrogram import raw, utils
+from pyrogram.errors import FloodWait
+from config import Config
+from .concurrency import download_limiter, upload_limiter, CONGESTION_ERRORS
+from .parallel import media_sessions, upload_stats, count_part
+
+# Telegram upload parts: 512 KiB each, files above 10 MiB use the "big" API
+PART_SIZE = 512 * 1024
+BIG_FILE_SIZE = 10 * 1024 * 1024
+
+
+def can_stream(file_size, thumbnail):
+    """Stream big files straight through; anything needing a local copy
+    (a custom thumbnail, an unknown size) still goes through the disk"""
+    return (
+        Config.STREAM_THRESHOLD > 0
+        and not thumbnail
+        and bool(file_size)
+        and file_size >= Config.STREAM_THRESHOLD
+    )
+
+
+def random_id():
+    return int.from_bytes(os.urandom(8), "big", signed=True)
+
+
+async def feed_chunks(client, message, queue):
+    """Producer: push downloaded chunks into the bounded queue, then None
+    (or the error that stopped the download)"""
+    try:
+        async for chunk in client.stream_media(message):
+            await queue.put(chunk)
+    except Exception as e:
+        await queue.put(e)
+        return
+    await queue.put(None)
+
+
+async def stream_rename(client, message, chat_id, file_type, new_filename, caption, progress=None, progress_args=(), send_type=None):
+    """Re-send a file under a new name without writing it to disk
+
+    Chunks from stream_media go through a queue of Config.STREAM_BUFFER_CHUNKS
+    (1 MiB each) into upload parts, so memory use stays the same whatever the
+    file size. Config.UPLOAD_PARTS parts are sent at once over the media
+    session pool, and a part that fails is retried up to
+    Config.TRANSFER_RETRIES times like in parallel_upload. The upload is only
+    turned into a message once every part is in, sent as `send_type` (by
+    default the same type as the original).
+    """
+    media = getattr(message, file_type)
+    file_size = media.file_size
+    is_big = file_size > BIG_FILE_SIZE
+    total_parts = (file_size + PART_SIZE - 1) // PART_SIZE
+    file_id = random_id()
+    md5 = None if is_big else hashlib.md5()
+
+    sessions = await media_sessions(client, await client.storage.dc_id(), max(1, Config.MEDIA_SESSIONS))
+    senders = max(1, min(Config.UPLOAD_PARTS, total_parts))
+    queue = asyncio.Queue(maxsize=max(1, Config.STREAM_BUFFER_CHUNKS))
+    parts = asyncio.Queue(maxsize=senders)
+    part = 0
+    uploaded = 0
+
+    async def send_part(session, index, data):
+        nonlocal uploaded
+        if is_big:
+            request = raw.functions.upload.SaveBigFilePart(
+                file_id=file_id, file_part=index, file_total_parts=total_parts, bytes=data
+            )
+        else:
+            request = raw.functions.upload.SaveFilePart(file_id=file_id, file_part=index, bytes=data)
+        failures = 0
+        while True:
+            started = time.monotonic()
+            try:
+                if not await session.invoke(request, sleep_threshold=30):
+                    raise OSError(f"part {index} of {new_filename} was not saved")
+                break
+            except FloodWait as e:
+                upload_limiter.congestion()
+                await asyncio.sleep(e.value)
+            except (OSError, asyncio.TimeoutError, TimeoutError) as e:
+                if isinstance(e, CONGESTION_ERRORS):
+                    upload_limiter.congestion()
+                failures += 1
+                upload_stats['retries'] += 1
+                if failures > Config.TRANSFER_RETRIES:
+                    raise
+                await asyncio.sleep(failures)
+        count_part(time.monotonic() - started)
+        uploaded += len(data)
+        if progress:
+            await progress(min(uploaded, file_size), file_size, *progress_args)
+
+    async def sender(session):
+        while True:
+            item = await parts.get()
+            if item is None:
+                return
+            await send_part(session, *item)
+
+    async def split():
+        """Cut the downloaded chunks into parts for the senders, in order"""
+        nonlocal part
+        buffer = bytearray()
+        while True:
+            chunk = await queue.get()
+            if chunk is None:
+                break
+            if isinstance(chunk, Exception):
+                raise chunk
+            buffer += chunk
+            while len(buffer) >= PART_SIZE:
+                data = bytes(buffer[:PART_SIZE])
+                del buffer[:PART_SIZE]
+                if not is_big:
+                    md5.update(data)
+                await parts.put((part, data))
+                part += 1
+        if buffer:
+            if not is_big:
+                md5.update(buffer)
+            await parts.put((part, bytes(buffer)))
+            part += 1
+        for _ in range(senders):
+            await parts.put(None)
+
+    producer = asyncio.create_task(feed_chunks(client, message, queue))
+    tasks = [asyncio.create_task(split())] + [
+        asyncio.create_task(sender(sessions[index % len(sessions)])) for index in range(senders)
+    ]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        producer.cancel()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    if part != total_parts:
+        # stream_media swallows FloodWait and just stops; take a short stream as congestion
+        download_limiter.congestion()
+        raise Exception(f"Stream ended after {uploaded} of {file_size} bytes")
+
+    if is_big:
+        input_file = raw.types.InputFileBig(id=file_id, parts=total_parts, name=new_filename)
+    else:
+        input_file = raw.types.InputFile(id=file_id, parts=total_parts, name=new_filename, md5_checksum=md5.hexdigest())
+
+    await send_uploaded_file(client, chat_id, media, send_type or file_type, input_file, new_filename, caption)
+
+
+async def send_uploaded_file(client, chat_id, media, send_type, input_file, file_name, caption, thumb=None, info=None):
+    """Send a file whose parts are already uploaded, as `send_type`
+    ("video", "audio" or "document"), taking duration and size from the
+    probed `info` or else from `media`"""
+    info = info or {}
+    attributes = [raw.types.DocumentAttributeFilename(file_name=file_name)]
+    if send_type == "video":
+        attributes.insert(0, raw.types.DocumentAttributeVideo(
+            supports_streaming=True,
+            duration=info.get("duration") or getattr(media, "duration", 0) or 0,
+            w=info.get("width") or getattr(media, "width", 0) or 0,
+            h=info.get("height") or getattr(media, "height", 0) or 0
+        ))
+    elif send_type == "audio":
+        attributes.insert(0, raw.types.DocumentAttributeAudio(
+            duration=info.get("duration") or getattr(media, "duration", 0) or 0,
+            title=getattr(media, "title", None),
+            performer=getattr(media, "performer", None)
+        ))
+
+    await client.invoke(
+        raw.functions.messages.SendMedia(
+            peer=await client.resolve_peer(chat_id),
+            media=raw.types.InputMediaUploadedDocument(
+                mime_type=mimetypes.guess_type(file_name)[0] or getattr(media, "mime_type", None) or "application/octet-stream",
+                file=input_file,
+                thumb=thumb,
+                attributes=attributes,
+                force_file=True if send_type == "document" else None
+            ),
+            random_id=random_id(),
+            **await utils.parse_text_entities(client, caption, None, None)
+        )
+    )
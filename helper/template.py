@@ -0,0 +1,63 @@
+import re
+from collections import namedtuple
+
+# Placeholders a rename template may use, written as {episode}, {quality} ...
+TEMPLATE_FIELDS = [
+    "episode", "quality", "season", "filename", "ext", "filesize", "duration",
+    "codec", "audio", "language", "group", "crc",
+]
+
+brace_field = re.compile(r'\{(' + '|'.join(TEMPLATE_FIELDS) + r')\}')
+# Older templates use the bare words, e.g. "Naruto S02 - EPepisode - quality"
+bare_field = re.compile(r'(episode|quality)')
+
+# Compiled templates per user, dropped by invalidate_template()
+template_cache = {}
+
+# A template split into (is_field, text) segments, and the suffix setting
+CompiledTemplate = namedtuple("CompiledTemplate", ["segments", "suffix"])
+
+
+def compile_template(template, prefix=None, suffix=None):
+    """Compile a rename template into (is_field, text) segments
+
+    Templates with any {field} placeholder are read as placeholders only, so
+    a literal "episode" in the title survives. Templates without braces keep
+    the old bare-word behaviour. The prefix goes in front of the name; the
+    suffix is kept aside for render_template to put before the extension.
+    """
+    pattern = brace_field if brace_field.search(template) else bare_field
+    segments = []
+    for index, part in enumerate(pattern.split(template)):
+        if part:
+            segments.append((index % 2 == 1, part))
+
+    if prefix:
+        segments.insert(0, (False, f"{prefix} "))
+    return CompiledTemplate(segments, suffix)
+
+
+def render_template(template, values):
+    """Render a compiled template, make sure the name ends with its extension
+    and put the suffix right before that extension, matching the settings
+    menu examples whether the template ends in {ext}, ".mkv" or neither"""
+    name = "".join(values[text] if is_field else text for is_field, text in template.segments)
+    ext = values["ext"]
+    if not name.endswith(ext):
+        name += ext
+    if template.suffix:
+        name = f"{name[:len(name) - len(ext)]} {template.suffix}{ext}"
+    return name
+
+
+def render_caption(caption, values):
+    """Fill {filename}, {filesize}, {duration} ... in a /set_caption text,
+    leaving any other braces in the caption untouched"""
+    def fill(match):
+        value = values.get(match.group(1))
+        return match.group(0) if value is None else str(value)
+    return brace_field.sub(fill, caption)
+
+
+def invalidate_template(user_id):
+    template_cache.pop(int(user_id), None)
@@ -0,0 +1,100 @@
+import os, asyncio
+from collections import OrderedDict
+from PIL import Image
+from pyrogram.file_id import FileId, FileUniqueId, FileUniqueType
+from config import Config
+from .scratch import THUMB_DIR
+
+THUMB_SIDE = 320
+THUMB_MAX_BYTES = 200 * 1024
+
+# file_unique_id -> (path, size), least recently used first
+thumb_cache = OrderedDict()
+thumb_fetches = {}
+
+
+def thumb_key(file_id):
+    """file_unique_id of a stored thumbnail file_id; stable when the
+    file_id itself changes for the same photo"""
+    try:
+        decoded = FileId.decode(file_id)
+        return FileUniqueId(file_unique_type=FileUniqueType.DOCUMENT, media_id=decoded.media_id).encode()
+    except Exception:
+        return file_id
+
+
+def make_thumb(source, target):
+    """Shrink a photo to a 320px JPEG under 200 KB (runs in a worker thread)"""
+    with Image.open(source) as image:
+        image = image.convert("RGB")
+        image.thumbnail((THUMB_SIDE, THUMB_SIDE))
+        quality = 90
+        image.save(target, "JPEG", quality=quality, optimize=True)
+        while os.path.getsize(target) > THUMB_MAX_BYTES and quality > 30:
+            quality -= 15
+            image.save(target, "JPEG", quality=quality, optimize=True)
+
+
+async def fetch_thumb(client, file_id, key):
+    os.makedirs(THUMB_DIR, exist_ok=True)
+    name = key.replace("/", "_")
+    source = os.path.join(THUMB_DIR, f"{name}.src")
+    target = os.path.join(THUMB_DIR, f"{name}.jpg")
+    try:
+        await client.download_media(file_id, file_name=source)
+        await asyncio.to_thread(make_thumb, source, target)
+    finally:
+        try:
+            os.remove(source)
+        except OSError:
+            pass
+    thumb_cache[key] = (target, os.path.getsize(target))
+    evict_thumbs()
+    return target
+
+
+def evict_thumbs():
+    """Drop least recently used thumbnails until the cache fits its byte budget"""
+    total = sum(size for _, size in thumb_cache.values())
+    while total > Config.THUMB_CACHE_BYTES and len(thumb_cache) > 1:
+        _, (path, size) = thumb_cache.popitem(last=False)
+        total -= size
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+async def get_thumb_path(client, file_id):
+    """Local JPEG for a thumbnail file_id, downloading and converting it only
+    the first time; concurrent callers share one fetch"""
+    if not file_id:
+        return None
+    key = thumb_key(file_id)
+    cached = thumb_cache.get(key)
+    if cached and os.path.exists(cached[0]):
+        thumb_cache.move_to_end(key)
+        return cached[0]
+
+    task = thumb_fetches.get(key)
+    if task is None:
+        task = asyncio.ensure_future(fetch_thumb(client, file_id, key))
+        thumb_fetches[key] = task
+        task.add_done_callback(lambda _: thumb_fetches.pop(key, None))
+    try:
+        return await asyncio.shield(task)
+    except Exception as e:
+        print(f"Thumbnail {key} could not be prepared: {e}")
+        return None
+
+
+def invalidate_thumb(file_id):
+    """Forget a thumbnail that a user just replaced or deleted"""
+    if not file_id:
+        return
+    cached = thumb_cache.pop(thumb_key(file_id), None)
+    if cached:
+        try:
+            os.remove(cached[0])
+        except OSError:
+            pass
@@ -1,5 +1,12 @@
 from config import Config, Txt
 from helper.database import madflixbotz
+from helper.parser import get_parser_stats, reset_parser_stats
+from helper.disk import disk_space
+from helper.scheduler import outbound_scheduler, priority
+from helper.concurrency import download_limiter, upload_limiter
+from helper.parallel import get_upload_stats
+from helper.probe import probe_stats
+from helper.utils import humanbytes
 from pyrogram.types import Message
 from pyrogram import Client, filters
 from pyrogram.errors import FloodWait, InputUserDeactivated, UserIsBlocked, PeerIdInvalid
@@ -41,15 +48,76 @@ async def tutorial(bot,message):
 	)
 
 
+def format_rule_hits(hits):
+    if not hits:
+        return "-"
+    return ", ".join(f"{rule}: {count}" for rule, count in sorted(hits.items(), key=lambda item: -item[1]))
+
+
+def parser_stats_text():
+    stats = get_parser_stats()
+    return (
+        f"\n\n**🧩 Filename Parser :**"
+        f"\n**Parsed :** `{stats['memo_misses']}` | **Memo Hits :** `{stats['memo_hits']}`"
+        f"\n**Parse Time :** `{stats['parse_time'] * 1000:.2f} ms`"
+        f"\n**Episode Rules :** `{format_rule_hits(stats['episode_hits'])}`"
+        f"\n**Episode Default (01) :** `{stats['episode_defaults']}`"
+        f"\n**Quality Rules :** `{format_rule_hits(stats['quality_hits'])}`"
+        f"\n**Quality Default (720p) :** `{stats['quality_defaults']}`"
+    )
+
+
+async def disk_stats_text():
+    stats = await disk_space.stats()
+    return (
+        f"\n\n**💽 Download Disk :**"
+        f"\n**Free :** `{humanbytes(stats['free']) or '0 B'}`"
+        f"\n**Reserved :** `{humanbytes(stats['reserved']) or '0 B'}` by `{stats['active']}` jobs, `{humanbytes(stats['written']) or '0 B'}` written"
+        f"\n**Idle Partials :** `{humanbytes(stats['idle_partials']) or '0 B'}`"
+        f"\n**Queued :** `{humanbytes(stats['queued_bytes']) or '0 B'}` in `{stats['queued']}` jobs"
+    )
+
+
+def transfer_stats_text():
+    lines = "\n\n**🚚 Transfer Limits :**"
+    for limiter in (download_limiter, upload_limiter):
+        stats = limiter.metrics()
+        lines += (
+            f"\n**{limiter.name.title()} :** `{stats['in_flight']}/{stats['limit']}` running, `{stats['queued']}` waiting"
+            f" | `{humanbytes(stats['rate']) or '0 B'}/s` | ↑`{stats['increases']}` ↓`{stats['decreases']}` FloodWait/Timeout `{stats['congestion']}`"
+        )
+    parts = get_upload_stats()
+    lines += (
+        f"\n**Upload Parts :** `{parts['parts']}` sent, `{parts['retries']}` retried"
+        f" | **Latency :** avg `{parts['latency_avg'] * 1000:.0f} ms`, max `{parts['latency_max'] * 1000:.0f} ms`"
+        f"\n**Media Probes :** `{probe_stats['probes']}` run, `{probe_stats['hits']}` cached, `{probe_stats['failures']}` failed"
+    )
+    return lines
+
+
+def outbound_stats_text():
+    stats = outbound_scheduler.metrics()
+    queued = stats['queued']
+    return (
+        f"\n\n**📤 Outbound Scheduler :**"
+        f"\n**Queued :** `{queued['interactive']}` replies | `{queued['progress']}` progress | `{queued['broadcast']}` broadcast"
+        f"\n**Sent :** `{stats['granted']}` | **Avg Wait :** `{stats['avg_wait'] * 1000:.0f} ms` | **Max Wait :** `{stats['max_wait']:.1f} s`"
+        f"\n**FloodWaits :** `{stats['flood_waits']}` | **Paused Chats :** `{stats['paused_chats']}`"
+    )
+
+
 @Client.on_message(filters.command(["stats", "status"]) & filters.user(Config.ADMIN))
 async def get_stats(bot, message):
+    if len(message.command) > 1 and message.command[1].lower() == "reset":
+        reset_parser_stats()
+        return await message.reply_text("**Parser Stats Reset ✅**")
     total_users = await madflixbotz.total_users_count()
     uptime = time.strftime("%Hh%Mm%Ss", time.gmtime(time.time() - bot.uptime))    
     start_t = time.time()
     st = await message.reply('**Accessing The Details.....**')    
     end_t = time.time()
     time_taken_s = (end_t - start_t) * 1000
-    await st.edit(text=f"**--Bot Status--** \n\n**⌚️ Bot Uptime :** {uptime} \n**🐌 Current Ping :** `{time_taken_s:.3f} ms` \n**👭 Total Users :** `{total_users}`")
+    await st.edit(text=f"**--Bot Status--** \n\n**⌚️ Bot Uptime :** {uptime} \n**🐌 Current Ping :** `{time_taken_s:.3f} ms` \n**👭 Total Users :** `{total_users}`" + parser_stats_text() + await disk_stats_text() + transfer_stats_text() + outbound_stats_text())
 
 @Client.on_message(filters.command("broadcast") & filters.user(Config.ADMIN) & filters.reply)
 async def broadcast_handler(bot: Client, m: Message):
@@ -78,11 +146,13 @@ async def broadcast_handler(bot: Client, m: Message):
            
 async def send_msg(user_id, message):
     try:
-        await message.copy(chat_id=int(user_id))
+        # Broadcast copies wait behind replies and progress edits
+        with priority("broadcast"):
+            await message.copy(chat_id=int(user_id))
         return 200
     except FloodWait as e:
         await asyncio.sleep(e.value)
-        return send_msg(user_id, message)
+        return await send_msg(user_id, message)
     except InputUserDeactivated:
         logger.info(f"{user_id} : Deactivated")
         return 400
@@ -3,552 +3,42 @@ from pyrogram.errors import FloodWait
 from pyrogram.types import InputMediaDocument, Message, InlineKeyboardButton, InlineKeyboardMarkup
 from PIL import Image
 from datetime import datetime
-from hachoir.metadata import extractMetadata
-from hachoir.parser import createParser
 from helper.utils import progress_for_pyrogram, humanbytes, convert
+from helper.progress import progress_reporter
+from helper.parser import parse_filename, parse_filenames, sort_key, determine_file_type
+from helper.template import compile_template, render_template, render_caption, template_cache
+from helper.stream import can_stream, stream_rename, send_uploaded_file
+from helper.scratch import new_scratch_dir, scratch_target, place_download, remove_scratch
+from helper.disk import disk_space, DiskSpaceError
+from helper.thumbs import get_thumb_path
+from helper.concurrency import download_limiter, upload_limiter, counted
+from helper.parallel import can_download_parallel, parallel_download, discard_partial, can_upload_parallel, parallel_upload
+from helper.jobs import renaming_operations
+from helper.probe import probe_media
 from helper.database import madflixbotz
 from config import Config
 import os
 import time
-import re
+import asyncio
+from bisect import insort
 from collections import defaultdict
 
 # Global storage for batch processing
 user_file_queues = defaultdict(list)
 user_batch_states = {}
 
-renaming_operations = {}
 # Store user states for manual renaming
 user_manual_rename_state = {}
 
-# ORIGINAL EPISODE PATTERNS
-# Pattern 1: S01E02 or S01EP02
-pattern1 = re.compile(r'S(\d+)(?:E|EP)(\d+)')
-# Pattern 2: S01 E02 or S01 EP02 or S01 - E01 or S01 - EP02
-pattern2 = re.compile(r'S(\d+)\s*(?:E|EP|-\s*EP)(\d+)')
-# Pattern 3: Episode Number After "E" or "EP"
-pattern3 = re.compile(r'(?:[([<{]?\s*(?:E|EP)\s*(\d+)\s*[)\]>}]?)')
-# Pattern 3_2: episode number after - [hyphen]
-pattern3_2 = re.compile(r'(?:\s*-\s*(\d+)\s*)')
-# Pattern 4: S2 09 ex.
-pattern4 = re.compile(r'S(\d+)[^\d]*(\d+)', re.IGNORECASE)
-# Pattern X: Standalone Episode Number
-patternX = re.compile(r'(\d+)')
-# Pattern Y: Any number in filename (fallback)
-patternY = re.compile(r'[^\d]*(\d+)[^\d]*', re.IGNORECASE)
-
-# NEW EPISODE PATTERNS (30+ additional patterns)
-# Pattern 11: Episode with dots (Episode.01, Ep.02)
-pattern11 = re.compile(r'(?:Episode|Ep)\.(\d+)', re.IGNORECASE)
-
-# Pattern 12: Episode with underscores (Episode_01, Ep_02)
-pattern12 = re.compile(r'(?:Episode|Ep)_(\d+)', re.IGNORECASE)
-
-# Pattern 13: Episode in brackets [01], [Episode 01]
-pattern13 = re.compile(r'\[(?:Episode\s*)?(\d+)\]', re.IGNORECASE)
-
-# Pattern 14: Episode in parentheses (01), (Episode 01)
-pattern14 = re.compile(r'\((?:Episode\s*)?(\d+)\)', re.IGNORECASE)
-
-# Pattern 15: Episode with colon (Episode: 01)
-pattern15 = re.compile(r'Episode:\s*(\d+)', re.IGNORECASE)
-
-# Pattern 16: Two digit episodes (01, 02, 99)
-pattern16 = re.compile(r'\b(\d{2})\b')
-
-# Pattern 17: Three digit episodes (001, 002, 999)
-pattern17 = re.compile(r'\b(\d{3})\b')
-
-# Pattern 18: Episode with 'of' (01 of 12, 1 of 24)
-pattern18 = re.compile(r'(\d+)\s*of\s*\d+', re.IGNORECASE)
-
-# Pattern 19: Episode number after series name
-pattern19 = re.compile(r'[A-Za-z\s]+(\d+)(?:\s*$|\s*\[)', re.IGNORECASE)
-
-# Pattern 20: Episode with 'Part' (Part 1, Part 01)
-pattern20 = re.compile(r'Part\s*(\d+)', re.IGNORECASE)
-
-# Pattern 21: Episode with 'Chapter' (Chapter 1, Ch 01)
-pattern21 = re.compile(r'(?:Chapter|Ch)\s*(\d+)', re.IGNORECASE)
-
-# Pattern 22: Episode with '#' (#01, #1)
-pattern22 = re.compile(r'#(\d+)')
-
-# Pattern 23: Episode with 'x' separator (1x01, 2x05)
-pattern23 = re.compile(r'\d+x(\d+)', re.IGNORECASE)
-
-# Pattern 24: Episode in curly braces {01}, {Episode 01}
-pattern24 = re.compile(r'\{(?:Episode\s*)?(\d+)\}', re.IGNORECASE)
-
-# Pattern 25: Episode with 'Vol' (Vol 1, Volume 01)
-pattern25 = re.compile(r'(?:Vol|Volume)\s*(\d+)', re.IGNORECASE)
-
-# Pattern 26: Episode after hyphen (Series - 01, Name - Episode 1)
-pattern26 = re.compile(r'-\s*(?:Episode\s*)?(\d+)', re.IGNORECASE)
-
-# Pattern 27: Episode after underscore (Series_01, Name_Episode_1)
-pattern27 = re.compile(r'_(?:Episode_)?(\d+)', re.IGNORECASE)
-
-# Pattern 28: Episode with leading zeros (001, 0001)
-pattern28 = re.compile(r'\b0+(\d+)\b')
-
-# Pattern 29: Episode with roman numerals (I, II, III, IV, V)
-pattern29 = re.compile(r'\b(I|II|III|IV|V|VI|VII|VIII|IX|X|XI|XII)\b', re.IGNORECASE)
-
-# Pattern 30: Episode spelled out (One, Two, Three, etc.)
-pattern30 = re.compile(r'\b(One|Two|Three|Four|Five|Six|Seven|Eight|Nine|Ten|Eleven|Twelve|Thirteen|Fourteen|Fifteen|Sixteen|Seventeen|Eighteen|Nineteen|Twenty)\b', re.IGNORECASE)
-
-# Pattern 31: Episode with 'No' (No.1, No.01, Number 1)
-pattern31 = re.compile(r'(?:No|Number)\.?\s*(\d+)', re.IGNORECASE)
-
-# Pattern 32: Episode between pipes (|01|, |Episode 1|)
-pattern32 = re.compile(r'\|(?:Episode\s*)?(\d+)\|', re.IGNORECASE)
-
-# Pattern 33: Episode with asterisks (*01*, *Episode 1*)
-pattern33 = re.compile(r'\*(?:Episode\s*)?(\d+)\*', re.IGNORECASE)
-
-# Pattern 34: Episode with plus signs (+01+, +Episode 1+)
-pattern34 = re.compile(r'\+(?:Episode\s*)?(\d+)\+', re.IGNORECASE)
-
-# Pattern 35: Episode with equals (=01=, =Episode 1=)
-pattern35 = re.compile(r'=(?:Episode\s*)?(\d+)=', re.IGNORECASE)
-
-# Pattern 36: Episode at the end of filename
-pattern36 = re.compile(r'(\d+)(?:\.[a-zA-Z0-9]+)?$')
-
-# Pattern 37: Episode with 'Ep' followed by space and number
-pattern37 = re.compile(r'Ep\s+(\d+)', re.IGNORECASE)
-
-# Pattern 38: Episode with 'Episode' followed by space and number
-pattern38 = re.compile(r'Episode\s+(\d+)', re.IGNORECASE)
-
-# Pattern 39: Multiple episodes (01-02, 1&2, 1+2)
-pattern39 = re.compile(r'(\d+)[-&+](\d+)')
-
-# Pattern 40: Episode with special anime numbering (001.5, 12.5)
-pattern40 = re.compile(r'(\d+)\.5')
-
-# Pattern 41: OVA/OAD numbering (OVA 1, OAD 01)
-pattern41 = re.compile(r'(?:OVA|OAD)\s*(\d+)', re.IGNORECASE)
-
-# Pattern 42: Special episodes (SP1, Special 01)
-pattern42 = re.compile(r'(?:SP|Special)\s*(\d+)', re.IGNORECASE)
-
-# ORIGINAL QUALITY PATTERNS 
-# Pattern 5: 3-4 digits before 'p' as quality
-pattern5 = re.compile(r'\b(?:.*?(\d{3,4}[^\dp]*p).*?|.*?(\d{3,4}p))\b', re.IGNORECASE)
-# Pattern 6: Find 4k in brackets or parentheses
-pattern6 = re.compile(r'[([<{]?\s*4k\s*[)\]>}]?', re.IGNORECASE)
-# Pattern 7: Find 2k in brackets or parentheses
-pattern7 = re.compile(r'[([<{]?\s*2k\s*[)\]>}]?', re.IGNORECASE)
-# Pattern 8: Find HdRip without spaces
-pattern8 = re.compile(r'[([<{]?\s*HdRip\s*[)\]>}]?|\bHdRip\b', re.IGNORECASE)
-# Pattern 9: Find 4kX264 in brackets or parentheses
-pattern9 = re.compile(r'[([<{]?\s*4kX264\s*[)\]>}]?', re.IGNORECASE)
-# Pattern 10: Find 4kx265 in brackets or parentheses
-pattern10 = re.compile(r'[([<{]?\s*4kx265\s*[)\]>}]?', re.IGNORECASE)
-
-# NEW QUALITY PATTERNS (additional quality detection)
-# Pattern 11: More quality formats
-pattern11_q = re.compile(r'\b(480p|576p|720p|1080p|1440p|2160p|4320p)\b', re.IGNORECASE)
-
-# Pattern 12: Quality with brackets [720p], (1080p)
-pattern12_q = re.compile(r'[([<{]\s*(\d{3,4}p)\s*[)\]>}]', re.IGNORECASE)
-
-# Pattern 13: BluRay quality indicators
-pattern13_q = re.compile(r'\b(BluRay|BDRip|BD|BRRip)\b', re.IGNORECASE)
-
-# Pattern 14: Web quality indicators
-pattern14_q = re.compile(r'\b(WEBRip|WEB-DL|WEB)\b', re.IGNORECASE)
-
-# Pattern 15: TV quality indicators
-pattern15_q = re.compile(r'\b(TVRip|HDTV|SDTV)\b', re.IGNORECASE)
-
-# Pattern 16: CAM/TS quality
-pattern16_q = re.compile(r'\b(CAM|TS|TC|SCR)\b', re.IGNORECASE)
-
-# Pattern 17: DVD quality
-pattern17_q = re.compile(r'\b(DVDRip|DVD)\b', re.IGNORECASE)
-
-def extract_quality(filename):
-    # Try new quality patterns first (most specific)
-    
-    # Pattern 11: Standard quality formats
-    match = re.search(pattern11_q, filename)
-    if match:
-        print("Matched Quality Pattern 11")
-        return match.group(1)
-    
-    # Pattern 12: Quality with brackets
-    match = re.search(pattern12_q, filename)
-    if match:
-        print("Matched Quality Pattern 12")
-        return match.group(1)
-    
-    # Pattern 13: BluRay indicators
-    match = re.search(pattern13_q, filename)
-    if match:
-        print("Matched Quality Pattern 13")
-        return match.group(1)
-    
-    # Pattern 14: Web quality
-    match = re.search(pattern14_q, filename)
-    if match:
-        print("Matched Quality Pattern 14")
-        return match.group(1)
-    
-    # Pattern 15: TV quality
-    match = re.search(pattern15_q, filename)
-    if match:
-        print("Matched Quality Pattern 15")
-        return match.group(1)
-    
-    # Pattern 16: CAM/TS quality
-    match = re.search(pattern16_q, filename)
-    if match:
-        print("Matched Quality Pattern 16")
-        return match.group(1)
-    
-    # Pattern 17: DVD quality
-    match = re.search(pattern17_q, filename)
-    if match:
-        print("Matched Quality Pattern 17")
-        return match.group(1)
-
-    # Try existing patterns (Pattern 5-10)
-    match5 = re.search(pattern5, filename)
-    if match5:
-        print("Matched Pattern 5")
-        quality5 = match5.group(1) or match5.group(2)
-        print(f"Quality: {quality5}")
-        return quality5
-
-    match6 = re.search(pattern6, filename)
-    if match6:
-        print("Matched Pattern 6")
-        quality6 = "4k"
-        print(f"Quality: {quality6}")
-        return quality6
-
-    match7 = re.search(pattern7, filename)
-    if match7:
-        print("Matched Pattern 7")
-        quality7 = "2k"
-        print(f"Quality: {quality7}")
-        return quality7
-
-    match8 = re.search(pattern8, filename)
-    if match8:
-        print("Matched Pattern 8")
-        quality8 = "HdRip"
-        print(f"Quality: {quality8}")
-        return quality8
-
-    match9 = re.search(pattern9, filename)
-    if match9:
-        print("Matched Pattern 9")
-        quality9 = "4kX264"
-        print(f"Quality: {quality9}")
-        return quality9
-
-    match10 = re.search(pattern10, filename)
-    if match10:
-        print("Matched Pattern 10")
-        quality10 = "4kx265"
-        print(f"Quality: {quality10}")
-        return quality10    
-
-    # Return "720p" as default
-    default_quality = "720p"
-    print(f"Quality: {default_quality} (default)")
-    return default_quality
-    
-
-def extract_episode_number(filename):
-    # Roman numeral conversion dictionary
-    roman_dict = {
-        'I': '1', 'II': '2', 'III': '3', 'IV': '4', 'V': '5',
-        'VI': '6', 'VII': '7', 'VIII': '8', 'IX': '9', 'X': '10',
-        'XI': '11', 'XII': '12'
-    }
-    
-    # Spelled number conversion dictionary
-    word_dict = {
-        'one': '1', 'two': '2', 'three': '3', 'four': '4', 'five': '5',
-        'six': '6', 'seven': '7', 'eight': '8', 'nine': '9', 'ten': '10',
-        'eleven': '11', 'twelve': '12', 'thirteen': '13', 'fourteen': '14',
-        'fifteen': '15', 'sixteen': '16', 'seventeen': '17', 'eighteen': '18',
-        'nineteen': '19', 'twenty': '20'
-    }
-    
-    # Try Pattern 1: S01E02 or S01EP02
-    match = re.search(pattern1, filename)
-    if match:
-        print("Matched Pattern 1")
-        return match.group(2)
-    
-    # Try Pattern 2: S01 E02 or S01 EP02
-    match = re.search(pattern2, filename)
-    if match:
-        print("Matched Pattern 2")
-        return match.group(2)
-
-    # Try Pattern 3: Episode Number After "E" or "EP"
-    match = re.search(pattern3, filename)
-    if match:
-        print("Matched Pattern 3")
-        return match.group(1)
-
-    # Try Pattern 3_2: episode number after - [hyphen]
-    match = re.search(pattern3_2, filename)
-    if match:
-        print("Matched Pattern 3_2")
-        return match.group(1)
-        
-    # Try Pattern 4: S2 09 ex.
-    match = re.search(pattern4, filename)
-    if match:
-        print("Matched Pattern 4")
-        return match.group(2)
-
-    # Try Pattern 11: Episode with dots
-    match = re.search(pattern11, filename)
-    if match:
-        print("Matched Pattern 11")
-        return match.group(1)
-
-    # Try Pattern 12: Episode with underscores
-    match = re.search(pattern12, filename)
-    if match:
-        print("Matched Pattern 12")
-        return match.group(1)
-
-    # Try Pattern 13: Episode in brackets
-    match = re.search(pattern13, filename)
-    if match:
-        print("Matched Pattern 13")
-        return match.group(1)
-
-    # Try Pattern 14: Episode in parentheses
-    match = re.search(pattern14, filename)
-    if match:
-        print("Matched Pattern 14")
-        return match.group(1)
-
-    # Try Pattern 15: Episode with colon
-    match = re.search(pattern15, filename)
-    if match:
-        print("Matched Pattern 15")
-        return match.group(1)
-
-    # Try Pattern 18: Episode with 'of'
-    match = re.search(pattern18, filename)
-    if match:
-        print("Matched Pattern 18")
-        return match.group(1)
-
-    # Try Pattern 20: Episode with 'Part'
-    match = re.search(pattern20, filename)
-    if match:
-        print("Matched Pattern 20")
-        return match.group(1)
-
-    # Try Pattern 21: Episode with 'Chapter'
-    match = re.search(pattern21, filename)
-    if match:
-        print("Matched Pattern 21")
-        return match.group(1)
-
-    # Try Pattern 22: Episode with '#'
-    match = re.search(pattern22, filename)
-    if match:
-        print("Matched Pattern 22")
-        return match.group(1)
-
-    # Try Pattern 23: Episode with 'x' separator
-    match = re.search(pattern23, filename)
-    if match:
-        print("Matched Pattern 23")
-        return match.group(1)
-
-    # Try Pattern 24: Episode in curly braces
-    match = re.search(pattern24, filename)
-    if match:
-        print("Matched Pattern 24")
-        return match.group(1)
-
-    # Try Pattern 25: Episode with 'Vol'
-    match = re.search(pattern25, filename)
-    if match:
-        print("Matched Pattern 25")
-        return match.group(1)
-
-    # Try Pattern 26: Episode after hyphen
-    match = re.search(pattern26, filename)
-    if match:
-        print("Matched Pattern 26")
-        return match.group(1)
-
-    # Try Pattern 27: Episode after underscore
-    match = re.search(pattern27, filename)
-    if match:
-        print("Matched Pattern 27")
-        return match.group(1)
-
-    # Try Pattern 28: Episode with leading zeros
-    match = re.search(pattern28, filename)
-    if match:
-        print("Matched Pattern 28")
-        return match.group(1)
-
-    # Try Pattern 29: Roman numerals
-    match = re.search(pattern29, filename)
-    if match:
-        print("Matched Pattern 29")
-        roman = match.group(1).upper()
-        return roman_dict.get(roman, "1")
-
-    # Try Pattern 30: Spelled out numbers
-    match = re.search(pattern30, filename)
-    if match:
-        print("Matched Pattern 30")
-        word = match.group(1).lower()
-        return word_dict.get(word, "1")
-
-    # Try Pattern 31: Episode with 'No'
-    match = re.search(pattern31, filename)
-    if match:
-        print("Matched Pattern 31")
-        return match.group(1)
-
-    # Try Pattern 32: Episode between pipes
-    match = re.search(pattern32, filename)
-    if match:
-        print("Matched Pattern 32")
-        return match.group(1)
-
-    # Try Pattern 33: Episode with asterisks
-    match = re.search(pattern33, filename)
-    if match:
-        print("Matched Pattern 33")
-        return match.group(1)
-
-    # Try Pattern 34: Episode with plus signs
-    match = re.search(pattern34, filename)
-    if match:
-        print("Matched Pattern 34")
-        return match.group(1)
-
-    # Try Pattern 35: Episode with equals
-    match = re.search(pattern35, filename)
-    if match:
-        print("Matched Pattern 35")
-        return match.group(1)
-
-    # Try Pattern 37: Ep followed by space
-    match = re.search(pattern37, filename)
-    if match:
-        print("Matched Pattern 37")
-        return match.group(1)
-
-    # Try Pattern 38: Episode followed by space
-    match = re.search(pattern38, filename)
-    if match:
-        print("Matched Pattern 38")
-        return match.group(1)
-
-    # Try Pattern 39: Multiple episodes (take first)
-    match = re.search(pattern39, filename)
-    if match:
-        print("Matched Pattern 39")
-        return match.group(1)
-
-    # Try Pattern 40: Special numbering (12.5 -> 12)
-    match = re.search(pattern40, filename)
-    if match:
-        print("Matched Pattern 40")
-        return match.group(1)
-
-    # Try Pattern 41: OVA/OAD numbering
-    match = re.search(pattern41, filename)
-    if match:
-        print("Matched Pattern 41")
-        return match.group(1)
-
-    # Try Pattern 42: Special episodes
-    match = re.search(pattern42, filename)
-    if match:
-        print("Matched Pattern 42")
-        return match.group(1)
-
-    # Try Pattern 17: Three digit episodes
-    match = re.search(pattern17, filename)
-    if match:
-        print("Matched Pattern 17")
-        return match.group(1)
-
-    # Try Pattern 16: Two digit episodes
-    match = re.search(pattern16, filename)
-    if match:
-        print("Matched Pattern 16")
-        return match.group(1)
-
-    # Try Pattern 36: Episode at end of filename
-    match = re.search(pattern36, filename)
-    if match:
-        print("Matched Pattern 36")
-        return match.group(1)
-
-    # Try Pattern X: Standalone Episode Number
-    match = re.search(patternX, filename)
-    if match:
-        print("Matched Pattern X")
-        return match.group(1)
-    
-    # Try Pattern Y: Any number in filename (fallback)
-    match = re.search(patternY, filename)
-    if match:
-        print("Matched Pattern Y (any number)")
-        return match.group(1)
-        
-    # Return "01" as default if no number found
-    print("No episode number found, using default: 01")
-    return "01"
-
-def determine_file_type(file_extension):
-    """Determine if file should be treated as video, audio, or document based on extension"""
-    video_extensions = [
-        '.mp4', '.mkv', '.avi', '.mov', '.wmv', '.flv', '.webm', '.m4v', 
-        '.3gp', '.ts', '.mpg', '.mpeg', '.rm', '.rmvb', '.asf', '.divx',
-        '.xvid', '.f4v', '.m2ts', '.mts', '.vob', '.ogv', '.mxf', '.qt'
-    ]
-    audio_extensions = [
-        '.mp3', '.flac', '.wav', '.aac', '.ogg', '.wma', '.m4a', '.opus',
-        '.ape', '.ac3', '.dts', '.amr', '.ra', '.au', '.aiff', '.caf'
-    ]
-    
-    file_extension = file_extension.lower()
-    
-    if file_extension in video_extensions:
-        return "video"
-    elif file_extension in audio_extensions:
-        return "audio"
-    else:
-        return "document"
+# Cancel buttons under a batch's progress message
+batch_cancel_buttons = InlineKeyboardMarkup([[
+    InlineKeyboardButton("✖️ Cancel File ✖️", callback_data="cancel_job"),
+    InlineKeyboardButton("✖️ Cancel Batch ✖️", callback_data="cancel_batch")
+]])
 
 def sequence_files(files):
-    """Sequence files based on episode numbers extracted from filenames"""
-    def get_sort_key(file_info):
-        filename = file_info['original_filename']
-        episode = extract_episode_number(filename)
-        if episode:
-            try:
-                return int(episode)
-            except:
-                pass
-        return float('inf')  # Put files without episode numbers at the end
-    
-    return sorted(files, key=get_sort_key)
+    """Sequence files by season, episode, half episode, OVA/SP and arrival"""
+    return sorted(files, key=lambda file_info: file_info['sort_key'])
 
 # Handle /stop command for manual rename
 @Client.on_message(filters.private & filters.command("stop"))
@@ -562,8 +52,43 @@ async def stop_manual_rename(client, message):
     else:
         await message.reply_text("**No active manual rename session found.**")
 
+# Handle /cancel command for running transfers
+@Client.on_message(filters.private & filters.command("cancel"))
+async def cancel_command(client, message):
+    user_id = message.from_user.id
+    job_id = int(message.command[1]) if len(message.command) > 1 and message.command[1].isdigit() else None
+    cancelled = renaming_operations.cancel(user_id, job_id)
+    
+    if cancelled:
+        names = "\n".join(f"• `{operation.name}`" for operation in cancelled[:20])
+        more = f"\n• ...and {len(cancelled) - 20} more" if len(cancelled) > 20 else ""
+        await message.reply_text(f"**❌ Cancelled {len(cancelled)} file(s):**\n\n{names}{more}")
+    elif renaming_operations.running(user_id):
+        jobs = "\n".join(f"• `{operation.job_id}` - `{operation.name}`" for operation in renaming_operations.running(user_id))
+        await message.reply_text(f"**No running file with that id.**\n\n**Running:**\n{jobs}\n\nUse `/cancel` to cancel all or `/cancel id` for one.")
+    else:
+        await message.reply_text("**No running transfers found.**")
+
+# Cancel buttons under progress messages
+@Client.on_callback_query(filters.regex("^cancel_(job|batch)$"))
+async def cancel_callback(client, callback_query):
+    user_id = callback_query.from_user.id
+    operations = renaming_operations.for_message(user_id, callback_query.message)
+    
+    if not operations:
+        # Nothing is running behind this message any more, just close it
+        await callback_query.message.delete()
+        return
+    
+    if callback_query.data == "cancel_job":
+        # Jobs on one message run in order, the oldest is the file in progress
+        operations = operations[:1]
+    for operation in operations:
+        operation.cancel()
+    await callback_query.answer(f"Cancelling {len(operations)} file(s)...")
+
 # Handle text messages for manual rename
-@Client.on_message(filters.private & filters.text & ~filters.command(["start", "settings", "tutorial", "stats", "broadcast", "restart", "stop", "autorename", "done"]))
+@Client.on_message(filters.private & filters.text & ~filters.command(["start", "settings", "tutorial", "stats", "broadcast", "restart", "stop", "cancel", "autorename", "done"]))
 async def handle_manual_rename_text(client, message):
     user_id = message.from_user.id
     
@@ -620,10 +145,17 @@ async def autorename_command(client, message):
             f"**💡 Usage:**\n"
             f"`/autorename Your Template Here`\n\n"
             f"**📋 Variables:**\n"
-            f"• `episode` - Episode number\n"
-            f"• `quality` - Video quality\n\n"
+            f"• `{{episode}}` - Episode number\n"
+            f"• `{{quality}}` - Video quality\n"
+            f"• `{{season}}` - Season number\n"
+            f"• `{{filename}}` - Original filename\n"
+            f"• `{{ext}}` - File extension\n"
+            f"• `{{filesize}}` - File size\n"
+            f"• `{{duration}}` - Duration\n"
+            f"• `{{codec}}` `{{audio}}` `{{language}}` - Codec, audio, language tags\n"
+            f"• `{{group}}` `{{crc}}` - Release group, CRC32\n\n"
             f"**📌 Example:**\n"
-            f"`/autorename Naruto Shippuden S02 - EPepisode - quality [Dual Audio] - @YourChannel`"
+            f"`/autorename Naruto Shippuden S{{season}} - EP{{episode}} - {{quality}} [Dual Audio] - @YourChannel`"
         )
         return
     
@@ -664,6 +196,7 @@ async def handle_batch_collection(client, message, user_id):
             'file_id': message.document.file_id,
             'original_filename': message.document.file_name or "document",
             'file_size': message.document.file_size,
+            'caption': message.caption,
             'message': message
         }
     elif message.video:
@@ -672,6 +205,8 @@ async def handle_batch_collection(client, message, user_id):
             'file_id': message.video.file_id,
             'original_filename': message.video.file_name or "video.mp4",
             'file_size': message.video.file_size,
+            'duration': message.video.duration,
+            'caption': message.caption,
             'message': message
         }
     elif message.audio:
@@ -680,13 +215,19 @@ async def handle_batch_collection(client, message, user_id):
             'file_id': message.audio.file_id, 
             'original_filename': message.audio.file_name or "audio.mp3",
             'file_size': message.audio.file_size,
+            'duration': message.audio.duration,
+            'caption': message.caption,
             'message': message
         }
     else:
         return
     
-    # Add to user's file queue
-    user_file_queues[user_id].append(file_info)
+    # Parse once on arrival; later stages read the cached record
+    file_info['parsed'] = parse_filename(file_info['original_filename'])
+    file_info['sort_key'] = sort_key(file_info['parsed'], len(user_file_queues[user_id]))
+    
+    # Add to user's file queue, kept in episode order as files arrive
+    insort(user_file_queues[user_id], file_info, key=lambda queued: queued['sort_key'])
     
     # Send or update collection message
     if user_id not in user_batch_states:
@@ -718,10 +259,16 @@ async def done_command(client, message):
         await message.reply_text("**No files found to process!**\n\nPlease send some files first.")
         return
     
-    # Sequence files
+    # Files are already in order from handle_batch_collection; only entries
+    # that missed the parse on arrival need parsing and a re-sequence
     files = user_file_queues[user_id]
-    sequenced_files = sequence_files(files)
-    user_file_queues[user_id] = sequenced_files
+    unparsed = [(index, file_info) for index, file_info in enumerate(files) if 'parsed' not in file_info]
+    if unparsed:
+        parsed = await parse_filenames([file_info['original_filename'] for _, file_info in unparsed])
+        for (index, file_info), parsed_name in zip(unparsed, parsed):
+            file_info['parsed'] = parsed_name
+            file_info['sort_key'] = sort_key(parsed_name, index)
+        user_file_queues[user_id] = sequence_files(files)
     
     await message.reply_text("**Sequencing your files...**")
     
@@ -766,224 +313,445 @@ async def handle_rename_option(client, callback_query):
     if option == "filename":
         await process_files_with_template(client, callback_query.message, user_id)
     elif option == "caption":
-        await callback_query.edit_message_text("**Caption option coming soon!**")
+        await process_files_with_template(client, callback_query.message, user_id, source="caption")
     elif option == "default_filename":
         await process_files_default_filename(client, callback_query.message, user_id)
     elif option == "default_caption":
-        await callback_query.edit_message_text("**Default Caption option coming soon!**")
+        await process_files_default_filename(client, callback_query.message, user_id, source="caption")
+
+def caption_title(caption):
+    """First non-empty line of a caption, used as the name in Default Caption"""
+    for line in (caption or "").splitlines():
+        if line.strip():
+            return line.strip()
+    return ""
+
+async def parse_captions(files):
+    """Parse each queued caption once (through the filename memo)"""
+    pending = [file_info for file_info in files if 'caption_parsed' not in file_info and file_info.get('caption')]
+    if pending:
+        parsed = await parse_filenames([" ".join(file_info['caption'].split()) for file_info in pending])
+        for file_info, parsed_name in zip(pending, parsed):
+            file_info['caption_parsed'] = parsed_name
+
+async def drop_flagged_files(client, user_id, files, flagged):
+    """Tell the user which files are skipped before any download starts"""
+    if flagged:
+        names = "\n".join(f"• `{file_info['original_filename']}`" for file_info in flagged[:20])
+        more = f"\n• ...and {len(flagged) - 20} more" if len(flagged) > 20 else ""
+        await client.send_message(
+            user_id,
+            f"**⚠️ Skipped {len(flagged)} file(s), no usable info in caption:**\n\n{names}{more}"
+        )
+    flagged_ids = {id(file_info) for file_info in flagged}
+    return [file_info for file_info in files if id(file_info) not in flagged_ids]
+
+async def get_compiled_template(user_id):
+    """Return the user's compiled rename template, compiling it on first use"""
+    template = template_cache.get(user_id)
+    if template is None:
+        template = compile_template(
+            await madflixbotz.get_format_template(user_id) or "",
+            await madflixbotz.get_prefix(user_id),
+            await madflixbotz.get_suffix(user_id)
+        )
+        template_cache[user_id] = template
+    return template
+
+def template_values(file_info, parsed=None):
+    """Placeholder values for a queued file, taken from its cached ParsedName
+
+    {season} is the season found in the name, two digits wide so S2 and S02
+    files render alike; only a name with no season marker at all gets "01",
+    the same season 1 that sort_key assumes for it.
+    """
+    parsed = parsed or file_info['parsed']
+    return {
+        'episode': parsed.episode,
+        'quality': parsed.quality,
+        'season': parsed.season.zfill(2) if parsed.season else "01",
+        'filename': os.path.splitext(file_info['original_filename'])[0],
+        'ext': file_info['parsed'].extension,
+        'filesize': humanbytes(file_info['file_size']),
+        'duration': convert(file_info['duration']) if file_info.get('duration') else "",
+        'codec': parsed.codec,
+        'audio': parsed.audio,
+        'language': parsed.language,
+        'group': parsed.group,
+        'crc': parsed.crc,
+    }
 
-async def process_files_with_template(client, message, user_id):
-    """Process files using auto rename template"""
+async def process_files_with_template(client, message, user_id, source="filename"):
+    """Process files using auto rename template, reading info from filename or caption"""
     files = user_file_queues[user_id]
-    format_template = await madflixbotz.get_format_template(user_id)
+    template = await get_compiled_template(user_id)
+    
+    if source == "caption":
+        await parse_captions(files)
+        flagged = [
+            file_info for file_info in files
+            if 'caption_parsed' not in file_info or file_info['caption_parsed'].rule is None
+        ]
+        files = await drop_flagged_files(client, user_id, files, flagged)
+    
+    user_caption = await madflixbotz.get_caption(user_id)
+    jobs = []
+    for i, file_info in enumerate(files, 1):
+        # Generate new filename from the compiled template
+        parsed = file_info['caption_parsed'] if source == "caption" else file_info['parsed']
+        values = template_values(file_info, parsed)
+        new_filename = render_template(template, values)
+        print(f"Original: {file_info['original_filename']}")
+        print(f"New filename: {new_filename}")
+        job = {
+            'index': i,
+            'file_info': file_info,
+            'new_filename': new_filename,
+            'label': "Renamed",
+            'values': values,
+            'user_caption': user_caption
+        }
+        job['caption'] = job_caption(job)
+        jobs.append(job)
     
-    # Create downloads directory if it doesn't exist
-    os.makedirs("downloads", exist_ok=True)
+    await run_batch(client, message, user_id, jobs)
+
+async def process_files_default_filename(client, message, user_id, source="filename"):
+    """Process files with default filenames (no template), from filename or caption"""
+    files = user_file_queues[user_id]
     
-    total_files = len(files)
+    if source == "caption":
+        flagged = [file_info for file_info in files if not caption_title(file_info.get('caption'))]
+        files = await drop_flagged_files(client, user_id, files, flagged)
     
+    user_caption = await madflixbotz.get_caption(user_id)
+    jobs = []
     for i, file_info in enumerate(files, 1):
-        try:
-            # Generate new filename using template - ENHANCED VERSION
-            original_filename = file_info['original_filename']
-            episode_num = extract_episode_number(original_filename)
-            quality = extract_quality(original_filename)
-
-            new_filename = format_template
-
-            # Replace episode number (if found)
-            if episode_num and "episode" in new_filename:
-                new_filename = new_filename.replace("episode", episode_num)
-            elif "episode" in new_filename:
-                # If no episode found but template has "episode", replace with "01"
-                new_filename = new_filename.replace("episode", "01")
-
-            # Replace quality (if found)
-            if quality and "quality" in new_filename:
-                new_filename = new_filename.replace("quality", quality)
-            elif "quality" in new_filename:
-                # If no quality found but template has "quality", replace with "720p"
-                new_filename = new_filename.replace("quality", "720p")
-
-            # Get file extension and ensure it's added
-            _, ext = os.path.splitext(original_filename)
+        # Use original filename, or the caption's first line
+        if source == "caption":
+            new_filename = caption_title(file_info['caption'])
+            ext = file_info['parsed'].extension
             if not new_filename.endswith(ext):
                 new_filename += ext
-
-            print(f"Original: {original_filename}")
-            print(f"Template: {format_template}")
-            print(f"Episode: {episode_num}")
-            print(f"Quality: {quality}")
-            print(f"New filename: {new_filename}")
-            
-            # Update progress message
-            progress_msg = await message.edit_text(
-                f"**Task Running: {i}**\n\n"
-                f"**{i}.Downloading...**\n"
-                f"**Progress:** 0.0%\n"
-                f"**Processed:** 0.00B of {humanbytes(file_info['file_size'])}\n"
-                f"**Speed:** 0.00B/s | **ETA:** -\n"
-                f"**Elapsed:** 0s\n"
-                f"**Upload:** Telegram\n"
-                f"**/cancel** AgADMRoAAqLp"
-            )
-            
-            # Download file (let pyrogram handle filename automatically)
-            start_time = time.time()
-            downloaded_file = await client.download_media(
-                file_info['message'],
-                progress=batch_progress_callback,
-                progress_args=(progress_msg, f"**{i}.Downloading...**", file_info['file_size'], start_time)
-            )
-            
-            # Upload with new filename
-            await progress_msg.edit_text(
-                f"**Task Running: {i}**\n\n"
-                f"**{i}.Uploading...**\n"
-                f"**Progress:** 0.0%\n"
-                f"**Upload:** Telegram"
-            )
+        else:
+            new_filename = file_info['original_filename']
+        job = {
+            'index': i,
+            'file_info': file_info,
+            'new_filename': new_filename,
+            'label': "File",
+            'values': template_values(file_info),
+            'user_caption': user_caption
+        }
+        job['caption'] = job_caption(job)
+        jobs.append(job)
+    
+    await run_batch(client, message, user_id, jobs)
+
+async def run_batch(client, message, user_id, jobs):
+    """Download up to Config.BATCH_PREFETCH files ahead while earlier ones upload
+
+    Uploads always happen in job (episode) order: the loop awaits each job's
+    download task in sequence, so files that finish early wait their turn.
+    Every file is a job in renaming_operations, so one file or the whole
+    batch can be cancelled from the progress message or with /cancel.
+    """
+    # Each file downloads into its own scratch directory
+    for job in jobs:
+        job['scratch'] = new_scratch_dir(user_id)
+        job['operation'] = renaming_operations.add(user_id, job['new_filename'], message)
+    
+    thumbnail = await madflixbotz.get_thumbnail(user_id)
+    prefetch = max(1, Config.BATCH_PREFETCH)
+    batch = {'message': message, 'current': None}
+    downloads = {}
+    started = 0
+    cancelled = 0
+    
+    try:
+        for position, job in enumerate(jobs):
+            i = job['index']
+            operation = job['operation']
             
-            # Get thumbnail
-            thumbnail = await madflixbotz.get_thumbnail(user_id)
+            # Keep the next `prefetch` downloads running ahead of the uploads. A
+            # streamed file only reserves disk space if it falls back to disk, so
+            # nothing behind it is started until it is sent: those files would
+            # hold space the fallback may need and only give it back afterwards
+            while started < len(jobs) and started < position + prefetch:
+                ahead = jobs[started]
+                mode = transfer_mode(ahead, thumbnail)
+                if mode == "stream":
+                    if started == position:
+                        started += 1
+                    break
+                if mode == "disk":
+                    ahead['reservation'] = ahead['operation'].attach(asyncio.create_task(reserve_batch_space(ahead)))
+                    downloads[started] = ahead['operation'].attach(
+                        asyncio.create_task(download_batch_file(client, ahead, batch))
+                    )
+                started += 1
             
-            # Upload file
-            start_time = time.time()
-            if file_info['type'] == 'video':
-                await client.send_video(
-                    chat_id=user_id,
-                    video=downloaded_file,
-                    caption=f"**Renamed:** `{new_filename}`",
-                    thumb=thumbnail,
-                    progress=batch_progress_callback,
-                    progress_args=(progress_msg, f"**{i}.Uploading...**", file_info['file_size'], start_time)
-                )
-            elif file_info['type'] == 'document':
-                await client.send_document(
-                    chat_id=user_id,
-                    document=downloaded_file,
-                    caption=f"**Renamed:** `{new_filename}`",
-                    thumb=thumbnail,
-                    progress=batch_progress_callback,
-                    progress_args=(progress_msg, f"**{i}.Uploading...**", file_info['file_size'], start_time)
-                )
-            elif file_info['type'] == 'audio':
-                await client.send_audio(
-                    chat_id=user_id,
-                    audio=downloaded_file,
-                    caption=f"**Renamed:** `{new_filename}`",
-                    thumb=thumbnail,
-                    progress=batch_progress_callback,
-                    progress_args=(progress_msg, f"**{i}.Uploading...**", file_info['file_size'], start_time)
-                )
-            
-            # Clean up downloaded file
+            batch['current'] = i
+            # A cancelled file's download stays in `downloads` to be reaped below
+            download = None if operation.cancelled else downloads.pop(position, None)
             try:
-                os.remove(downloaded_file)
-            except:
-                pass
-                
-        except Exception as e:
-            await client.send_message(user_id, f"**Error processing file {i}:** {str(e)}")
-            print(f"Error processing file {i} for user {user_id}: {e}")
+                if not operation.cancelled:
+                    await operation.run(process_batch_job(client, message, user_id, job, download, batch, thumbnail))
+            except asyncio.CancelledError:
+                # Only swallow a cancel the user asked for, not one of the batch itself
+                if not operation.cancelled:
+                    raise
+            except Exception as e:
+                await client.send_message(user_id, f"**Error processing file {i}:** {str(e)}")
+                print(f"Error processing file {i} for user {user_id}: {e}")
+            finally:
+                # Clean up downloaded file
+                finish_job(job)
+            if operation.cancelled:
+                cancelled += 1
+    finally:
+        # Drop anything still downloading ahead if the batch stops early
+        for task in downloads.values():
+            task.cancel()
+        await asyncio.gather(*downloads.values(), return_exceptions=True)
+        for job in jobs:
+            finish_job(job)
     
     # Clear user's queue and state
     user_file_queues[user_id].clear()
     if user_id in user_batch_states:
         del user_batch_states[user_id]
     
-    await message.edit_text(f"**✅ All {total_files} files processed successfully!**")
-
-async def process_files_default_filename(client, message, user_id):
-    """Process files with default filenames (no template)"""
-    files = user_file_queues[user_id]
-    
-    # Create downloads directory if it doesn't exist
-    os.makedirs("downloads", exist_ok=True)
-    
-    total_files = len(files)
+    if cancelled:
+        progress_reporter.report(message, f"**✅ {len(jobs) - cancelled} files processed, ❌ {cancelled} cancelled.**")
+    else:
+        progress_reporter.report(message, f"**✅ All {len(jobs)} files processed successfully!**")
+
+async def process_batch_job(client, message, user_id, job, download, batch, thumbnail):
+    """Send one batch file: by file_id, streamed, or from its prefetched `download`"""
+    i = job['index']
+    file_info = job['file_info']
+    mode = transfer_mode(job, thumbnail)
+    if mode == "cached":
+        # Nothing about the file itself changes, resend it by file_id
+        await client.send_cached_media(
+            chat_id=user_id,
+            file_id=file_info['file_id'],
+            caption=job['caption']
+        )
+        return
     
-    for i, file_info in enumerate(files, 1):
+    if mode == "stream":
+        progress_reporter.report(
+            message,
+            f"**Task Running: {i}**\n\n"
+            f"**{i}.Streaming...**\n"
+            f"**Progress:** 0.0%\n"
+            f"**Upload:** Telegram",
+            reply_markup=batch_cancel_buttons
+        )
         try:
-            # Use original filename
-            new_filename = file_info['original_filename']
-            
-            # Update progress message
-            progress_msg = await message.edit_text(
-                f"**Task Running: {i}**\n\n"
-                f"**{i}.Downloading...**\n"
-                f"**Progress:** 0.0%"
-            )
-            
-            # Download file (let pyrogram handle filename automatically)
-            start_time = time.time()
-            downloaded_file = await client.download_media(
-                file_info['message'],
-                progress=batch_progress_callback,
-                progress_args=(progress_msg, f"**{i}.Downloading...**", file_info['file_size'], start_time)
-            )
-            
-            # Upload with original filename
-            await progress_msg.edit_text(
-                f"**Task Running: {i}**\n\n"
-                f"**{i}.Uploading...**"
-            )
-            
-            # Get thumbnail
-            thumbnail = await madflixbotz.get_thumbnail(user_id)
-            
-            # Upload file
-            start_time = time.time()
-            if file_info['type'] == 'video':
-                await client.send_video(
-                    chat_id=user_id,
-                    video=downloaded_file,
-                    caption=f"**File:** `{new_filename}`",
-                    thumb=thumbnail,
-                    progress=batch_progress_callback,
-                    progress_args=(progress_msg, f"**{i}.Uploading...**", file_info['file_size'], start_time)
-                )
-            elif file_info['type'] == 'document':
-                await client.send_document(
-                    chat_id=user_id,
-                    document=downloaded_file,
-                    caption=f"**File:** `{new_filename}`",
-                    thumb=thumbnail,
-                    progress=batch_progress_callback,
-                    progress_args=(progress_msg, f"**{i}.Uploading...**", file_info['file_size'], start_time)
+            async with download_limiter.slot():
+                await stream_rename(
+                    client, file_info['message'], user_id, file_info['type'],
+                    job['new_filename'], job['caption'],
+                    progress=counted(download_limiter, batch_progress_callback),
+                    progress_args=(message, f"**{i}.Streaming...**", file_info['file_size'], time.time())
                 )
-            elif file_info['type'] == 'audio':
-                await client.send_audio(
-                    chat_id=user_id,
-                    audio=downloaded_file,
-                    caption=f"**File:** `{new_filename}`",
-                    thumb=thumbnail,
-                    progress=batch_progress_callback,
-                    progress_args=(progress_msg, f"**{i}.Uploading...**", file_info['file_size'], start_time)
-                )
-            
-            # Clean up
-            try:
-                os.remove(downloaded_file)
-            except:
-                pass
-                
+            return
         except Exception as e:
-            await client.send_message(user_id, f"**Error processing file {i}:** {str(e)}")
-    
-    # Clear queue
-    user_file_queues[user_id].clear()
-    if user_id in user_batch_states:
-        del user_batch_states[user_id]
-    
-    await message.edit_text(f"**✅ All {total_files} files processed successfully!**")
+            print(f"Streaming file {i} failed for user {user_id}, using disk instead: {e}")
+            job['reservation'] = job['operation'].attach(asyncio.create_task(reserve_batch_space(job)))
+            download = job['operation'].attach(asyncio.create_task(download_batch_file(client, job, batch)))
+    
+    if not download.done():
+        progress_reporter.report(
+            message,
+            f"**Task Running: {i}**\n\n"
+            f"**{i}.Downloading...**\n"
+            f"**Progress:** 0.0%\n"
+            f"**Processed:** 0.00B of {humanbytes(file_info['file_size'])}\n"
+            f"**Upload:** Telegram",
+            reply_markup=batch_cancel_buttons
+        )
+    downloaded_file = await download
+    info = None
+    if wants_probe(file_info['type'], job['new_filename']):
+        info = await probe_media(downloaded_file, getattr(file_info['message'], file_info['type'], None))
+        job['caption'] = job_caption(job, info)
+    
+    progress_reporter.report(
+        message,
+        f"**Task Running: {i}**\n\n"
+        f"**{i}.Uploading...**\n"
+        f"**Progress:** 0.0%\n"
+        f"**Upload:** Telegram",
+        reply_markup=batch_cancel_buttons
+    )
+    thumb_path = await get_thumb_path(client, thumbnail)
+    async with upload_limiter.slot():
+        await upload_batch_file(client, user_id, job, downloaded_file, thumb_path, message, info)
+
+def needs_transfer(new_filename, original_filename, thumbnail):
+    """A file only has to be downloaded and uploaded again if its name or
+    thumbnail changes; a new caption alone can reuse the Telegram file_id"""
+    return bool(thumbnail) or new_filename != original_filename
+
+def transfer_mode(job, thumbnail):
+    """How a batch job gets sent: "cached" (file_id, new caption only),
+    "stream" (download piped into the upload) or "disk" (download, then upload)"""
+    file_info = job['file_info']
+    if not needs_transfer(job['new_filename'], file_info['original_filename'], thumbnail):
+        return "cached"
+    if can_stream(file_info['file_size'], thumbnail):
+        return "stream"
+    return "disk"
+
+def build_caption(user_caption, label, new_filename, values):
+    """Caption for a renamed file: the user's /set_caption text, then the name"""
+    caption = f"**{label}:** `{new_filename}`"
+    if user_caption:
+        caption = f"{render_caption(user_caption, dict(values, filename=new_filename))}\n\n{caption}"
+    return caption
+
+def job_caption(job, info=None):
+    """Caption for a batch job; a probed duration fills {duration} when Telegram had none"""
+    values = job['values']
+    if info and info['duration'] and not values['duration']:
+        values = dict(values, duration=convert(info['duration']))
+    return build_caption(job['user_caption'], job['label'], job['new_filename'], values)
+
+def wants_probe(file_type, filename):
+    """Only videos and audio, or documents named like them, are worth probing"""
+    return file_type != "document" or determine_file_type(os.path.splitext(filename)[1]) != "document"
+
+def finish_job(job):
+    """Remove a batch job's scratch directory and give back its disk reservation"""
+    renaming_operations.finish(job['operation'])
+    remove_scratch(job['scratch'])
+    reservation = job.pop('reservation', None)
+    if reservation:
+        # Still queued if the job was cancelled; a grant in flight is given back
+        reservation.cancel()
+    reserved = job.pop('reserved', None)
+    if reserved is not None:
+        disk_space.release(reserved)
+
+async def reserve_batch_space(job):
+    """Reserve a batch file's disk space; a failure is returned for the
+    download to raise, so it fails that file and not the batch loop"""
+    try:
+        job['reserved'] = await disk_space.reserve(job['file_info']['file_size'])
+    except DiskSpaceError as e:
+        return e
+
+async def download_batch_file(client, job, batch):
+    """Download one batch file once its disk reservation and a global download slot are in"""
+    error = await job['reservation']
+    if error:
+        raise error
+    async with download_limiter.slot():
+        target = scratch_target(job['scratch'], job['new_filename'])
+        start_time = time.time()
+        return await download_file(
+            client, job['file_info']['message'], job['file_info']['type'], target,
+            counted(download_limiter, batch_download_progress),
+            (batch, job['index'], job['file_info']['file_size'], start_time)
+        )
+
+async def download_file(client, message, file_type, target, progress, progress_args):
+    """Download a message's file onto `target`, in parallel parts when it is big enough"""
+    media = getattr(message, file_type)
+    if can_download_parallel(media.file_size):
+        # A second attempt resumes from the checkpoint instead of starting over
+        for attempt in range(2):
+            try:
+                return await parallel_download(client, message, file_type, target, progress, progress_args)
+            except Exception as e:
+                print(f"Parallel download of {os.path.basename(target)} failed (attempt {attempt + 1}): {e}")
+    downloaded_file = await client.download_media(
+        message,
+        file_name=target,
+        progress=progress,
+        progress_args=progress_args
+    )
+    if downloaded_file is None:
+        # download_media swallows FloodWait and returns None; take it as congestion
+        download_limiter.congestion()
+    downloaded_file = place_download(downloaded_file, target)
+    # A failed parallel attempt may have left up to the whole file behind
+    discard_partial(media)
+    return downloaded_file
+
+async def batch_download_progress(current, total, batch, index, file_size, start_time):
+    """Only the file the batch is waiting on reports download progress"""
+    if batch['current'] == index:
+        await batch_progress_callback(current, total, batch['message'], f"**{index}.Downloading...**", file_size, start_time)
+
+async def upload_batch_file(client, user_id, job, downloaded_file, thumb_path, progress_msg, info=None):
+    """Upload one downloaded batch file with the send method for its type"""
+    i = job['index']
+    file_info = job['file_info']
+    start_time = time.time()
+    progress = counted(upload_limiter, batch_progress_callback)
+    progress_args = (progress_msg, f"**{i}.Uploading...**", file_info['file_size'], start_time)
+    media = getattr(file_info['message'], file_info['type'], None)
+    info = info or {}
+    if await upload_in_parts(client, user_id, file_info['type'], downloaded_file, media, job['caption'], thumb_path, progress, progress_args, info):
+        return
+    if file_info['type'] == 'video':
+        await client.send_video(
+            chat_id=user_id,
+            video=downloaded_file,
+            caption=job['caption'],
+            duration=info.get('duration', 0),
+            width=info.get('width', 0),
+            height=info.get('height', 0),
+            thumb=thumb_path,
+            progress=progress,
+            progress_args=progress_args
+        )
+    elif file_info['type'] == 'document':
+        await client.send_document(
+            chat_id=user_id,
+            document=downloaded_file,
+            caption=job['caption'],
+            thumb=thumb_path,
+            progress=progress,
+            progress_args=progress_args
+        )
+    elif file_info['type'] == 'audio':
+        await client.send_audio(
+            chat_id=user_id,
+            audio=downloaded_file,
+            caption=job['caption'],
+            duration=info.get('duration', 0),
+            thumb=thumb_path,
+            progress=progress,
+            progress_args=progress_args
+        )
+
+async def upload_in_parts(client, chat_id, send_type, path, media, caption, thumb_path, progress, progress_args, info=None):
+    """Upload a big file as parallel parts and send it; returns False when the
+    file is too small for that or the parallel upload failed"""
+    if not can_upload_parallel(os.path.getsize(path)):
+        return False
+    try:
+        input_file = await parallel_upload(client, path, progress, progress_args)
+        thumb = await client.save_file(thumb_path) if thumb_path else None
+        await send_uploaded_file(client, chat_id, media, send_type, input_file, os.path.basename(path), caption, thumb, info)
+        return True
+    except Exception as e:
+        print(f"Parallel upload of {os.path.basename(path)} failed, retrying with a normal upload: {e}")
+        return False
 
 async def batch_progress_callback(current, total, message, status, file_size, start_time):
     """Progress callback for batch download/upload"""
     try:
         now = time.time()
         diff = now - start_time
-        if round(diff % 5.00) == 0 or current == total:
+        # Every call hands over the latest state; the reporter decides when to edit
+        if total:
             percentage = current * 100 / total
             speed = current / diff if diff > 0 else 0
             elapsed_time = round(diff) * 1000
@@ -993,13 +761,15 @@ async def batch_progress_callback(current, total, message, status, file_size, st
             elapsed_time_str = convert(diff)
             estimated_time_str = convert(time_to_completion / 1000) if time_to_completion > 0 else "0s"
 
-            await message.edit_text(
+            progress_reporter.report(
+                message,
                 f"{status}\n"
                 f"**Progress:** {percentage:.1f}%\n"
                 f"**Processed:** {humanbytes(current)} of {humanbytes(total)}\n"
                 f"**Speed:** {humanbytes(speed)}/s | **ETA:** {estimated_time_str}\n"
                 f"**Elapsed:** {elapsed_time_str}\n"
-                f"**Upload:** Telegram"
+                f"**Upload:** Telegram",
+                reply_markup=batch_cancel_buttons
             )
     except:
         pass
@@ -1046,112 +816,202 @@ async def process_manual_rename(client, user_id):
     # Clear the state
     del user_manual_rename_state[user_id]
     
-    # Start rename process
-    await start_rename_process(client, file_message, new_filename, user_id)
-
-async def start_rename_process(client, file_message, new_filename, user_id):
+    # Start rename process as a job the user can cancel
+    operation = renaming_operations.add(user_id, new_filename)
+    try:
+        await operation.run(start_rename_process(client, file_message, new_filename, user_id, operation))
+    except asyncio.CancelledError:
+        if not operation.cancelled:
+            raise
+    finally:
+        renaming_operations.finish(operation)
+
+async def start_rename_process(client, file_message, new_filename, user_id, operation=None):
     """Start the rename process"""
+    scratch_dir = new_scratch_dir(user_id)
+    reserved = None
+    progress_msg = None
     try:
-        # Create downloads directory if it doesn't exist
-        os.makedirs("downloads", exist_ok=True)
-        
         # Get file info
         if file_message.document:
             file_id = file_message.document.file_id
             file_size = file_message.document.file_size
             file_type = "document"
             original_filename = file_message.document.file_name or "document"
+            duration = None
         elif file_message.video:
             file_id = file_message.video.file_id
             file_size = file_message.video.file_size
             file_type = "video"
             original_filename = file_message.video.file_name or "video.mp4"
+            duration = file_message.video.duration
         elif file_message.audio:
             file_id = file_message.audio.file_id
             file_size = file_message.audio.file_size
             file_type = "audio"
             original_filename = file_message.audio.file_name or "audio.mp3"
+            duration = file_message.audio.duration
         else:
             return
         
+        # Get user preferences
+        thumbnail = await madflixbotz.get_thumbnail(user_id)
+        caption = await madflixbotz.get_caption(user_id)
+        
+        # Prepare caption
+        caption_values = {
+            'ext': os.path.splitext(new_filename)[1],
+            'filesize': humanbytes(file_size),
+            'duration': convert(duration) if duration else "",
+        }
+        final_caption = build_caption(caption, "Renamed", new_filename, caption_values)
+        
+        # Determine file type based on extension if not clear; the stream and
+        # disk routes below both send it as this type
+        determined_type = determine_file_type(os.path.splitext(new_filename)[1])
+        if file_type == "video" or determined_type == "video":
+            send_type = "video"
+        elif file_type == "audio" or determined_type == "audio":
+            send_type = "audio"
+        else:
+            send_type = "document"
+        
+        # Same name and no thumbnail: only the caption changes, so resend the
+        # existing file_id instead of downloading and uploading it again
+        if not needs_transfer(new_filename, original_filename, thumbnail):
+            await client.send_cached_media(chat_id=user_id, file_id=file_id, caption=final_caption)
+            return
+        
+        # Big files without a thumbnail are piped straight from download to
+        # upload; if that fails they take the usual disk route below
+        if can_stream(file_size, thumbnail):
+            progress_msg = await file_message.reply_text("**🔄 Streaming File...**")
+            if operation:
+                operation.message = progress_msg
+            try:
+                async with download_limiter.slot():
+                    await stream_rename(
+                        client, file_message, user_id, file_type, new_filename, final_caption,
+                        progress=counted(download_limiter, progress_for_pyrogram),
+                        progress_args=("**🔄 Streaming File...**", progress_msg, time.time()),
+                        send_type=send_type
+                    )
+                progress_reporter.discard(progress_msg)
+                await progress_msg.delete()
+                return
+            except Exception as e:
+                print(f"Streaming failed for user {user_id}, using disk instead: {e}")
+                progress_reporter.discard(progress_msg)
+                try:
+                    await progress_msg.delete()
+                except:
+                    pass
+                progress_msg = None
+        
         # Create progress message
         progress_msg = await file_message.reply_text(
             "**🔄 Processing File...**\n\n"
             "**📥 Downloading:** 0%\n"
-            "**📤 Uploading:** Waiting..."
+            "**📤 Uploading:** Waiting...",
+            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("✖️ Cancel ✖️", callback_data="cancel_job")]])
         )
+        if operation:
+            operation.message = progress_msg
         
-        # Download the file (let pyrogram handle filename automatically)
+        # Wait for disk space, then download straight onto the new filename
+        # in this job's own directory
+        reserved = await disk_space.reserve(file_size)
+        target = scratch_target(scratch_dir, new_filename)
         start_time = time.time()
-        downloaded_file = await client.download_media(
-            file_message,
-            progress=progress_for_pyrogram,
-            progress_args=("**📥 Downloading File...**", progress_msg, start_time)
-        )
-        
-        # Get user preferences
-        thumbnail = await madflixbotz.get_thumbnail(user_id)
-        caption = await madflixbotz.get_caption(user_id)
-        
-        # Prepare caption
-        final_caption = f"**Renamed:** `{new_filename}`"
-        if caption:
-            final_caption = f"{caption}\n\n{final_caption}"
+        async with download_limiter.slot():
+            downloaded_file = await download_file(
+                client, file_message, file_type, target,
+                counted(download_limiter, progress_for_pyrogram),
+                ("**📥 Downloading File...**", progress_msg, start_time)
+            )
         
         # Update progress message for uploading
-        await progress_msg.edit_text(
+        progress_reporter.report(
+            progress_msg,
             "**🔄 Processing File...**\n\n"
             "**📥 Downloading:** ✅\n"
-            "**📤 Uploading:** 0%"
+            "**📤 Uploading:** 0%",
+            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("✖️ Cancel ✖️", callback_data="cancel_job")]])
         )
         
         # Upload file based on type
+        thumb_path = await get_thumb_path(client, thumbnail)
         start_time = time.time()
         
-        # Determine file type based on extension if not clear
-        _, ext = os.path.splitext(new_filename)
-        determined_type = determine_file_type(ext)
+        progress = counted(upload_limiter, progress_for_pyrogram)
+        progress_args = ("**📤 Uploading File...**", progress_msg, start_time)
         
-        if file_type == "video" or determined_type == "video":
-            await client.send_video(
-                chat_id=user_id,
-                video=downloaded_file,
-                caption=final_caption,
-                thumb=thumbnail,
-                progress=progress_for_pyrogram,
-                progress_args=("**📤 Uploading File...**", progress_msg, start_time)
-            )
-        elif file_type == "audio" or determined_type == "audio":
-            await client.send_audio(
-                chat_id=user_id,
-                audio=downloaded_file,
-                caption=final_caption,
-                thumb=thumbnail,
-                progress=progress_for_pyrogram,
-                progress_args=("**📤 Uploading File...**", progress_msg, start_time)
-            )
-        else:
-            await client.send_document(
-                chat_id=user_id,
-                document=downloaded_file,
-                caption=final_caption,
-                thumb=thumbnail,
-                progress=progress_for_pyrogram,
-                progress_args=("**📤 Uploading File...**", progress_msg, start_time)
-            )
+        # Read duration and size from the file itself, off the event loop
+        info = {}
+        if send_type != "document":
+            info = await probe_media(downloaded_file, getattr(file_message, file_type))
+            if info['duration'] and not duration:
+                final_caption = build_caption(
+                    caption, "Renamed", new_filename, dict(caption_values, duration=convert(info['duration']))
+                )
         
-        # Clean up
-        try:
-            os.remove(downloaded_file)
-        except:
-            pass
+        async with upload_limiter.slot():
+            sent = await upload_in_parts(
+                client, user_id, send_type, downloaded_file, getattr(file_message, file_type),
+                final_caption, thumb_path, progress, progress_args, info
+            )
+            if not sent and send_type == "video":
+                await client.send_video(
+                    chat_id=user_id,
+                    video=downloaded_file,
+                    caption=final_caption,
+                    duration=info.get('duration', 0),
+                    width=info.get('width', 0),
+                    height=info.get('height', 0),
+                    thumb=thumb_path,
+                    progress=progress,
+                    progress_args=progress_args
+                )
+            elif not sent and send_type == "audio":
+                await client.send_audio(
+                    chat_id=user_id,
+                    audio=downloaded_file,
+                    caption=final_caption,
+                    duration=info.get('duration', 0),
+                    thumb=thumb_path,
+                    progress=progress,
+                    progress_args=progress_args
+                )
+            elif not sent:
+                await client.send_document(
+                    chat_id=user_id,
+                    document=downloaded_file,
+                    caption=final_caption,
+                    thumb=thumb_path,
+                    progress=progress,
+                    progress_args=progress_args
+                )
         
         # Delete progress message
+        progress_reporter.discard(progress_msg)
         try:
             await progress_msg.delete()
         except:
             pass
             
+    except asyncio.CancelledError:
+        if progress_msg:
+            progress_reporter.discard(progress_msg)
+            try:
+                await progress_msg.edit_text(f"**❌ Cancelled:** `{new_filename}`")
+            except:
+                pass
+        raise
     except Exception as e:
         await client.send_message(user_id, f"**Error processing file:** {str(e)}")
         print(f"Error in rename process for user {user_id}: {e}")
+    finally:
+        # Clean up, whether the job finished, failed or was cancelled
+        remove_scratch(scratch_dir)
+        if reserved is not None:
+            disk_space.release(reserved)
@@ -757,7 +757,7 @@ async def set_auto_rename_template(client, callback_query):
         await callback_query.edit_message_text(
             "**📝 Auto Rename Template Not Set**\n\n"
             "**To set:** `/autorename Your Template Here`\n\n"
-            "**Example:** `/autorename Naruto S02 - EPepisode - quality`",
+            "**Example:** `/autorename Naruto S02 - EP{episode} - {quality}`",
             reply_markup=keyboard
         )
 
@@ -0,0 +1,118 @@
+"""Stand-in modules for the transfer benchmarks
+
+The benchmarks run the bot's own download and upload code against a
+simulated Telegram, so Pyrogram is always replaced here; its raw requests
+become plain records the fake sessions can read. The bot's other
+third-party imports are only replaced when they are not installed, with
+just enough to import the modules under test. Call install() before
+importing anything from helper or plugins.
+"""
+import os
+import sys
+import types
+import datetime
+import importlib.util
+from types import SimpleNamespace
+
+
+class Record(SimpleNamespace):
+    """A raw request or type: keeps whatever it was built with"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(args=args, **kwargs)
+
+
+def records(*names):
+    return SimpleNamespace(**{name: type(name, (Record,), {}) for name in names})
+
+
+class FloodWait(Exception):
+    def __init__(self, value=1):
+        super().__init__(f"A wait of {value} seconds is required")
+        self.value = value
+
+
+class Filter:
+    def __and__(self, other):
+        return self
+    __or__ = __rand__ = __ror__ = __and__
+
+    def __invert__(self):
+        return self
+
+    def __call__(self, *args, **kwargs):
+        return Filter()
+
+
+class Filters(types.ModuleType):
+    def __getattr__(self, name):
+        return Filter()
+
+
+class Client:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    @staticmethod
+    def on_message(*args, **kwargs):
+        return lambda handler: handler
+    on_callback_query = on_message
+
+
+class FileId(SimpleNamespace):
+    @staticmethod
+    def decode(file_id):
+        return FileId(media_id=1, access_hash=2, file_reference=b"", thumbnail_size="", dc_id=4)
+
+
+def module(name, **attributes):
+    fake = sys.modules[name] = types.ModuleType(name)
+    fake.__dict__.update(attributes)
+    if "." in name:
+        parent, _, child = name.rpartition(".")
+        setattr(sys.modules[parent], child, fake)
+    return fake
+
+
+def missing(name):
+    return name not in sys.modules and importlib.util.find_spec(name) is None
+
+
+def install():
+    # An empty DB_URL keeps helper.database on its in-memory store
+    os.environ["DB_URL"] = ""
+    sys.modules["pyrogram.filters"] = Filters("pyrogram.filters")
+    module("pyrogram", Client=Client, filters=sys.modules["pyrogram.filters"], enums=SimpleNamespace())
+    errors = ["MessageNotModified", "AuthBytesInvalid", "InputUserDeactivated", "UserIsBlocked", "PeerIdInvalid", "RPCError"]
+    module("pyrogram.errors", FloodWait=FloodWait, **{name: type(name, (Exception,), {}) for name in errors})
+    module("pyrogram.types", **vars(records(
+        "InputMediaDocument", "InputMediaPhoto", "Message", "CallbackQuery", "InlineKeyboardButton", "InlineKeyboardMarkup"
+    )))
+    module("pyrogram.raw",
+        functions=SimpleNamespace(upload=records("GetFile", "SaveFilePart", "SaveBigFilePart")),
+        types=SimpleNamespace(
+            upload=records("File"),
+            **vars(records("InputDocumentFileLocation", "InputFile", "InputFileBig")),
+        ),
+    )
+    module("pyrogram.raw.all", layer=0)
+    module("pyrogram.utils")
+    module("pyrogram.file_id", FileId=FileId, FileUniqueId=Record, FileUniqueType=SimpleNamespace(DOCUMENT=1))
+    module("pyrogram.session", Auth=Record, Session=Record)
+
+    if missing("PIL"):
+        module("PIL")
+        module("PIL.Image")
+    if missing("pytz"):
+        module("pytz", timezone=lambda name: datetime.timezone.utc)
+    if missing("motor"):
+        module("motor")
+        module("motor.motor_asyncio", AsyncIOMotorClient=Record)
+    if missing("hachoir"):
+        module("hachoir")
+        module("hachoir.core")
+        module("hachoir.core.config")
+        module("hachoir.metadata", extractMetadata=lambda parser: None)
+        module("hachoir.parser", createParser=lambda path, **kwargs: None)
+    if missing("psutil"):
+        module("psutil", disk_usage=lambda path: SimpleNamespace(free=1 << 50))
@@ -0,0 +1,128 @@
+"""Parallel download benchmark on a local fake transport
+
+    python tests/bench_parallel.py                   # 1, 2, 4 and 8 parts
+    python tests/bench_parallel.py --parts 1 4 16 --size 256
+
+Runs helper.parallel.parallel_download for one file with
+Config.DOWNLOAD_PARTS set to each value and reports throughput and whether
+the file came out intact. Every GetFile request waits a round trip, each
+media session moves one request's bytes at a time at the session's
+bandwidth, and all sessions share the link's bandwidth, so one sequential
+stream is held back by the round trips and extra parts help until the
+link is full. Pyrogram and any other missing third-party module are
+replaced by tests/bench_fakes.py.
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import hashlib
+import argparse
+import tempfile
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import bench_fakes
+
+MiB = 1024 * 1024
+
+
+class Link:
+    """Bandwidth shared by every session"""
+
+    def __init__(self, bandwidth):
+        self.bandwidth = bandwidth
+        self.busy_until = 0.0
+
+    async def transfer(self, nbytes):
+        loop = asyncio.get_running_loop()
+        start = max(loop.time(), self.busy_until)
+        self.busy_until = start + nbytes / self.bandwidth
+        await asyncio.sleep(self.busy_until - loop.time())
+
+
+class FakeSession:
+    """A media session serving GetFile from `blob`"""
+
+    def __init__(self, raw, blob, link, bandwidth, round_trip, failure_rate, rng):
+        self.raw = raw
+        self.blob = blob
+        self.link = link
+        self.bandwidth = bandwidth
+        self.round_trip = round_trip
+        self.failure_rate = failure_rate
+        self.rng = rng
+        self.lock = asyncio.Lock()
+
+    async def invoke(self, query, sleep_threshold=None):
+        await asyncio.sleep(self.round_trip / 2)
+        data = self.blob[query.offset:query.offset + query.limit]
+        async with self.lock:
+            await asyncio.gather(asyncio.sleep(len(data) / self.bandwidth), self.link.transfer(len(data)))
+        await asyncio.sleep(self.round_trip / 2)
+        if self.rng.random() < self.failure_rate:
+            raise OSError("Connection reset")
+        return self.raw.types.upload.File(bytes=data)
+
+
+async def run_once(parallel, blob, parts, args):
+    from config import Config
+    from pyrogram import raw
+    Config.DOWNLOAD_PARTS = parts
+    Config.MEDIA_SESSIONS = args.sessions
+    rng = random.Random(parts)
+    link = Link(args.link * MiB)
+    pool = [
+        FakeSession(raw, blob, link, args.session * MiB, args.round_trip, args.failures, rng)
+        for _ in range(args.sessions)
+    ]
+
+    async def media_sessions(client, dc_id, count):
+        return pool[:count]
+    parallel.media_sessions = media_sessions
+
+    media = SimpleNamespace(file_id="file", file_unique_id=f"unique{parts}", file_size=len(blob))
+    target = os.path.abspath(f"download-{parts}.mkv")
+    started = time.perf_counter()
+    await parallel.parallel_download(None, SimpleNamespace(video=media), "video", target)
+    elapsed = time.perf_counter() - started
+    with open(target, "rb") as file:
+        intact = hashlib.sha1(file.read()).digest() == hashlib.sha1(blob).digest()
+    os.remove(target)
+    return elapsed, intact
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--parts", type=int, nargs="+", default=[1, 2, 4, 8], help="values of DOWNLOAD_PARTS to compare")
+    parser.add_argument("--size", type=int, default=128, help="MiB in the file")
+    parser.add_argument("--sessions", type=int, default=4, help="media sessions in the pool")
+    parser.add_argument("--session", type=float, default=16, help="MiB/s of one session")
+    parser.add_argument("--link", type=float, default=64, help="MiB/s of the whole link")
+    parser.add_argument("--round-trip", type=float, default=0.06, help="seconds per request")
+    parser.add_argument("--failures", type=float, default=0.0, help="share of requests that fail and are retried")
+    args = parser.parse_args()
+
+    bench_fakes.install()
+    blob = random.Random(0).randbytes(args.size * MiB + 12345)
+    print(
+        f"{len(blob) / MiB:.0f} MiB over {args.sessions} sessions of {args.session:.0f} MiB/s, "
+        f"link {args.link:.0f} MiB/s, {args.round_trip * 1000:.0f} ms round trip, {args.failures:.0%} failures"
+    )
+    with tempfile.TemporaryDirectory(prefix="bench_parallel_") as scratch:
+        # downloads/partial/ is resolved against the working directory on import
+        os.chdir(scratch)
+        import helper.parallel as parallel
+        first = None
+        for parts in args.parts:
+            elapsed, intact = asyncio.run(run_once(parallel, blob, parts, args))
+            rate = len(blob) / MiB / elapsed
+            first = first or rate
+            print(f"parts={parts:<3} {rate:7.1f} MiB/s  {rate / first:5.2f}x  intact: {intact}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Event-loop lag during a large /done, with and without the parse pool
+
+    python tests/bench_parse_pool.py                 # 5,000 files
+    python tests/bench_parse_pool.py --files 20000
+
+Runs what done_command does for a queue of files that were not parsed on
+arrival: parse_filenames over all the names, then a sort_key per file and
+the sort. A watcher task sleeping --interval seconds at a time measures
+how late the loop wakes it, which is how long every other user's handler
+would have waited. Inline parsing (threshold above the batch) is compared
+with the process pool, cold (workers still to start) and warm. Needs only
+the standard library.
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import Config
+from helper import parser as name_parser
+from corpus import release_names, long_names
+
+
+async def watch(interval, lags, stop):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(interval)
+        lags.append(loop.time() - start - interval)
+
+
+async def done(names, interval):
+    """One /done over `names`: (seconds, lags seen by the watcher)"""
+    lags = []
+    stop = asyncio.Event()
+    watcher = asyncio.create_task(watch(interval, lags, stop))
+    await asyncio.sleep(interval)
+    started = time.perf_counter()
+    parsed = await name_parser.parse_filenames(names)
+    keys = [name_parser.sort_key(parsed_name, index) for index, parsed_name in enumerate(parsed)]
+    sorted(range(len(names)), key=keys.__getitem__)
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await watcher
+    return elapsed, sorted(lags)
+
+
+def run(names, threshold, interval):
+    Config.PARSE_POOL_THRESHOLD = threshold
+    # Nothing memoized, as for files that missed the parse on arrival
+    name_parser.reset_parser_stats()
+    return asyncio.run(done(names, interval))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=5000, help="files in the /done")
+    parser.add_argument("--interval", type=float, default=0.005, help="seconds the watcher sleeps")
+    args = parser.parse_args()
+
+    half = args.files // 2
+    names = [row[0] for row in release_names(args.files - half)] + long_names(half)
+    threshold = Config.PARSE_POOL_THRESHOLD
+    print(
+        f"/done over {len(names)} files ({len(set(names))} unique), pool threshold {threshold}, "
+        f"{Config.PARSE_POOL_WORKERS} workers, chunks of {Config.PARSE_CHUNK_SIZE}"
+    )
+    try:
+        for label, mode_threshold in (("inline", len(names) + 1), ("pool, cold", threshold), ("pool, warm", threshold)):
+            elapsed, lags = run(names, mode_threshold, args.interval)
+            p99 = lags[int(len(lags) * 0.99)] if lags else 0.0
+            print(
+                f"{label:<11} /done {elapsed * 1000:7.1f} ms  loop lag max {lags[-1] * 1000:7.1f} ms"
+                f"  p99 {p99 * 1000:6.1f} ms  ({len(lags)} wakeups)"
+            )
+    finally:
+        name_parser.close_parse_pool()
+
+
+if __name__ == "__main__":
+    main()
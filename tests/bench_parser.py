@@ -0,0 +1,212 @@
+"""Filename parser benchmark and accuracy report
+
+    python tests/bench_parser.py            # report, compared to the baseline
+    python tests/bench_parser.py --save     # also write a new baseline
+
+Reports names/sec, p50/p99 latency per call and peak bytes allocated per
+call of one uncached parse, plus episode/season/quality accuracy per
+pattern family of the corpus and how well sort_key sequences it. The old
+cascades in legacy_parser.py and the current matchers are also timed on
+the same batches of 10k release names (corpus, 200+ character and bare
+number names), and quality together with the release tags against the old
+quality cascade alone. Needs only the standard library.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import legacy_parser
+from helper.parser import build_parsed_name, sort_key, match_episode, match_quality, match_tags
+from corpus import load_corpus, release_names, long_names, bare_numbers
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "data", "parser_baseline.json")
+
+
+def same_number(found, expected):
+    try:
+        return int(found) == int(expected)
+    except (TypeError, ValueError):
+        return False
+
+
+def truth_key(row, arrival):
+    half = 5 if row["family"] == "half_episode" else 0
+    return (int(row["season"] or 1), int(row["episode"]), half, arrival)
+
+
+def accuracy(rows):
+    """Share of rows per family whose episode, season and quality come out right"""
+    families = {}
+    for row in rows:
+        parsed = build_parsed_name(row["name"])
+        stats = families.setdefault(row["family"], {"names": 0, "episode": 0, "season": 0, "quality": 0})
+        stats["names"] += 1
+        stats["episode"] += same_number(parsed.episode, row["episode"])
+        if row["season"]:
+            stats["season"] += same_number(parsed.season, row["season"])
+        else:
+            stats["season"] += parsed.season is None
+        stats["quality"] += parsed.quality.lower() == row["quality"].lower()
+    report = {}
+    for family, stats in sorted(families.items()):
+        names = stats.pop("names")
+        report[family] = {field: round(hits / names, 4) for field, hits in stats.items()}
+        report[family]["names"] = names
+    return report
+
+
+def sequence_accuracy(rows, seed=11):
+    """Share of neighbouring files that sort_key puts in the right order
+
+    Arrival order is shuffled, then the queue is sorted the way the bot
+    does it and each neighbouring pair is checked against the true
+    (season, episode, half episode) order."""
+    shuffled = list(rows)
+    random.Random(seed).shuffle(shuffled)
+    order = sorted(
+        range(len(shuffled)),
+        key=lambda index: sort_key(build_parsed_name(shuffled[index]["name"]), index)
+    )
+    truth = [truth_key(shuffled[index], 0)[:3] for index in order]
+    right = sum(1 for first, second in zip(truth, truth[1:]) if first <= second)
+    return round(right / max(1, len(truth) - 1), 4)
+
+
+def latency(names, repeat=3):
+    """Per-call latency of an uncached parse, in microseconds"""
+    samples = []
+    for _ in range(repeat):
+        for name in names:
+            started = time.perf_counter_ns()
+            build_parsed_name(name)
+            samples.append(time.perf_counter_ns() - started)
+    samples.sort()
+    total = sum(samples) / 1e9
+    return {
+        "names_per_sec": round(len(samples) / total),
+        "p50_us": round(samples[len(samples) // 2] / 1000, 2),
+        "p99_us": round(samples[int(len(samples) * 0.99)] / 1000, 2),
+    }
+
+
+def names_per_sec(function, names, repeat=3):
+    """Best of `repeat` runs of `function` over every name"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for name in names:
+            function(name)
+        best = min(best, time.perf_counter() - started)
+    return round(len(names) / best)
+
+
+def legacy_batches(count=10000):
+    return {
+        "release": [row[0] for row in release_names(count)],
+        "long": long_names(count),
+        "bare_number": bare_numbers(count),
+    }
+
+
+def quality_and_tags(name):
+    """What build_parsed_name does for quality and the release tags"""
+    tags = match_tags(name)
+    return match_quality(name, tags[-1]), tags
+
+
+def versus_legacy(batches=None, repeat=3):
+    """Names/sec of the old cascades and the current matchers on the same names"""
+    report = {}
+    for label, names in (batches or legacy_batches()).items():
+        report[label] = {
+            "episode_legacy": names_per_sec(legacy_parser.extract_episode_number, names, repeat),
+            "episode": names_per_sec(match_episode, names, repeat),
+            "quality_legacy": names_per_sec(legacy_parser.extract_quality, names, repeat),
+            "quality": names_per_sec(match_quality, names, repeat),
+            # Quality and the release tags together, against the old quality alone
+            "quality_tags": names_per_sec(quality_and_tags, names, repeat),
+        }
+    return report
+
+
+def allocations(names):
+    """Average peak bytes allocated while parsing one name"""
+    tracemalloc.start()
+    peaks = 0
+    for name in names:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        build_parsed_name(name)
+        peaks += tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    return round(peaks / len(names))
+
+
+def run(rows=None):
+    rows = rows or load_corpus()
+    names = [row["name"] for row in rows]
+    report = {
+        "python": platform.python_version(),
+        "corpus": len(rows),
+        "accuracy": accuracy(rows),
+        "sequence": sequence_accuracy(rows),
+        "latency": latency(names),
+        "alloc_bytes_per_call": allocations(names[:1000]),
+        "versus_legacy": versus_legacy(),
+    }
+    return report
+
+
+def load_baseline(path=BASELINE_PATH):
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def print_report(report, baseline=None):
+    old = baseline or {}
+    latency_now, latency_then = report["latency"], old.get("latency", {})
+    print(f"Corpus: {report['corpus']} names, Python {report['python']}")
+    for field in ("names_per_sec", "p50_us", "p99_us"):
+        print(f"  {field:14} {latency_now[field]:>10}   baseline {latency_then.get(field, '-')}")
+    print(f"  {'alloc_bytes':14} {report['alloc_bytes_per_call']:>10}   baseline {old.get('alloc_bytes_per_call', '-')}")
+    print(f"  {'sequence':14} {report['sequence']:>10}   baseline {old.get('sequence', '-')}")
+    print(f"  {'family':22} {'names':>6} {'episode':>8} {'season':>8} {'quality':>8}")
+    for family, stats in report["accuracy"].items():
+        then = old.get("accuracy", {}).get(family, {})
+        marks = "".join(
+            "!" if stats[field] < then.get(field, 0) else " " for field in ("episode", "season", "quality")
+        )
+        print(f"  {family:22} {stats['names']:>6} {stats['episode']:>8} {stats['season']:>8} {stats['quality']:>8} {marks}")
+    print("  names/sec on 10k names, old cascade -> now")
+    for label, rates in report["versus_legacy"].items():
+        pairs = [name for name in rates if not name.endswith("_legacy")]
+        print(f"  {label:14} " + "   ".join(
+            f"{name} {rates.get(name + '_legacy', rates['quality_legacy'])} -> {rates[name]}" for name in pairs
+        ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--save", action="store_true", help="write the result as the new baseline")
+    args = parser.parse_args()
+
+    report = run()
+    baseline = load_baseline() if os.path.exists(BASELINE_PATH) else None
+    print_report(report, baseline)
+    if args.save:
+        with open(BASELINE_PATH, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2, sort_keys=True)
+            file.write("\n")
+        print(f"Saved {BASELINE_PATH}")
+
+
+if __name__ == "__main__":
+    main()
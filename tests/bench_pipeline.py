@@ -0,0 +1,148 @@
+"""Batch pipeline benchmark on a simulated transport
+
+    python tests/bench_pipeline.py                  # 24 episodes, N=1 and N=3
+    python tests/bench_pipeline.py --prefetch 1 2 3 4
+
+Runs plugins.file_rename.run_batch for a batch of episodes with
+Config.BATCH_PREFETCH set to each N and reports the wall-clock time and
+whether the uploads came out in episode order. Downloads and uploads go
+over two simulated links (one per direction) with a fixed latency per
+request and a bandwidth that concurrent transfers share, so prefetching
+can only win by overlapping the two directions. Pyrogram and any other
+missing third-party module are replaced by tests/bench_fakes.py.
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import bench_fakes
+
+MB = 1000 * 1000
+
+
+class Link:
+    """One direction of the connection: each request waits `latency`, then
+    the bytes go through at `bandwidth`, one transfer at a time"""
+
+    def __init__(self, bandwidth, latency):
+        self.bandwidth = bandwidth
+        self.latency = latency
+        self.lock = asyncio.Lock()
+
+    async def transfer(self, nbytes):
+        await asyncio.sleep(self.latency)
+        async with self.lock:
+            await asyncio.sleep(nbytes / self.bandwidth)
+
+
+class FakeClient:
+    """The few Client methods run_batch calls, on top of two Links"""
+
+    def __init__(self, down, up):
+        self.down = down
+        self.up = up
+        self.sizes = {}
+        self.sent = []
+
+    async def download_media(self, message, file_name=None, progress=None, progress_args=()):
+        media = message.video
+        await self.down.transfer(media.file_size)
+        with open(file_name, "wb") as file:
+            file.write(b"\0" * 1024)
+        self.sizes[file_name] = media.file_size
+        return file_name
+
+    async def send_video(self, chat_id, video, caption=None, **kwargs):
+        await self.up.transfer(self.sizes[video])
+        self.sent.append(os.path.basename(video))
+    send_document = send_audio = send_video
+
+    async def send_message(self, chat_id, text, **kwargs):
+        print(text)
+
+
+class FakeMessage:
+    async def edit_text(self, *args, **kwargs):
+        return self
+
+
+def make_jobs(file_rename, count, seed=7):
+    """A batch of `count` episodes of 40-60 MB each, in episode order"""
+    from helper.parser import parse_filename
+    rng = random.Random(seed)
+    jobs = []
+    for index in range(1, count + 1):
+        name = f"Show - {index:02d} [1080p].mkv"
+        media = SimpleNamespace(
+            file_id=f"id{index}", file_unique_id=f"unique{index}",
+            file_size=rng.randint(40, 60) * MB, duration=1440, width=1920, height=1080
+        )
+        file_info = {
+            'file_id': media.file_id,
+            'file_size': media.file_size,
+            'type': "video",
+            'message': SimpleNamespace(video=media),
+            'original_filename': f"raw {index}.mkv",
+            'parsed': parse_filename(name),
+        }
+        job = {
+            'index': index,
+            'file_info': file_info,
+            'new_filename': name,
+            'label': "Renamed",
+            'values': file_rename.template_values(file_info),
+            'user_caption': None,
+        }
+        job['caption'] = file_rename.job_caption(job)
+        jobs.append(job)
+    return jobs
+
+
+async def run_once(file_rename, prefetch, count, bandwidth, latency):
+    from config import Config
+    Config.BATCH_PREFETCH = prefetch
+    client = FakeClient(Link(bandwidth, latency), Link(bandwidth, latency))
+    jobs = make_jobs(file_rename, count)
+    started = time.perf_counter()
+    await file_rename.run_batch(client, FakeMessage(), 1, jobs)
+    elapsed = time.perf_counter() - started
+    return elapsed, client.sent == [job['new_filename'] for job in jobs]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=24, help="episodes in the batch")
+    parser.add_argument("--prefetch", type=int, nargs="+", default=[1, 3], help="values of N to compare")
+    parser.add_argument("--bandwidth", type=float, default=1000, help="MB/s of each link")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds per request")
+    args = parser.parse_args()
+
+    bench_fakes.install()
+    from config import Config
+    # Plain downloads and uploads, so only the prefetch depth changes
+    Config.STREAM_THRESHOLD = 0
+    Config.DOWNLOAD_PARTS = 1
+    Config.UPLOAD_PARTS = 1
+
+    print(f"{args.files} episodes, {args.bandwidth:.0f} MB/s each way, {args.latency * 1000:.0f} ms per request")
+    with tempfile.TemporaryDirectory(prefix="bench_pipeline_") as scratch:
+        # downloads/ is resolved against the working directory on import
+        os.chdir(scratch)
+        import plugins.file_rename as file_rename
+        first = None
+        for prefetch in args.prefetch:
+            elapsed, ordered = asyncio.run(run_once(file_rename, prefetch, args.files, args.bandwidth * MB, args.latency))
+            first = first or elapsed
+            print(f"N={prefetch:<3} {elapsed:6.2f}s  {first / elapsed:4.2f}x  in order: {ordered}")
+
+
+if __name__ == "__main__":
+    main()
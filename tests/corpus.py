@@ -0,0 +1,176 @@
+"""Release-name corpus for the parser tests and benchmark
+
+data/release_names.tsv is checked in and is what the tests read. It was
+written by `python tests/corpus.py`, which builds the names from the
+templates below with a fixed seed, so it can be regenerated (and extended)
+reproducibly. Every row is annotated with what a person reads from the
+name: the pattern family, season, episode and quality.
+"""
+import os
+import csv
+import random
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "data", "release_names.tsv")
+FIELDS = ["name", "family", "season", "episode", "quality"]
+
+SHOWS = [
+    "Naruto Shippuden", "One Piece", "Attack on Titan", "Jujutsu Kaisen", "Demon Slayer",
+    "Spy x Family", "Chainsaw Man", "Bleach Thousand-Year Blood War", "My Hero Academia",
+    "Frieren Beyond Journey's End", "Solo Leveling", "Oshi no Ko", "Vinland Saga",
+    "Mushoku Tensei", "Dr. Stone", "Blue Lock", "Tokyo Revengers", "Black Clover",
+    "The Boys", "Breaking Bad", "Stranger Things", "The Last of Us", "House of the Dragon",
+    "Better Call Saul", "Game of Thrones", "The Mandalorian", "Severance", "Succession",
+    "Sakamoto Days", "Dandadan", "Kaiju No 8", "Wind Breaker", "Re Zero", "Overlord",
+]
+GROUPS = ["SubsPlease", "Erai-raws", "HorribleSubs", "Judas", "EMBER", "ASW", "Anime Time", "DKB"]
+SCENE_GROUPS = ["NTb", "FLUX", "GalaxyTV", "ION10", "MiNX", "EDITH", "SuccessfulCrab", "KOGi"]
+RESOLUTIONS = ["480p", "720p", "1080p", "2160p"]
+SOURCES = ["BluRay", "WEB-DL", "WEBRip", "HDTV", "DVDRip", "BDRip"]
+CODECS = ["x264", "x265", "HEVC", "H.264", "AV1", "10bit"]
+AUDIO = ["AAC", "AAC2.0", "DDP5.1", "FLAC", "Dual Audio", "Opus"]
+EXTENSIONS = [".mkv", ".mp4", ".mkv", ".mkv", ".avi"]
+
+
+def dotted(text):
+    return text.replace(" ", ".").replace("'", "")
+
+
+def crc(rng):
+    return "".join(rng.choice("0123456789ABCDEF") for _ in range(8))
+
+
+def release(rng):
+    """One annotated release name: (name, family, season, episode, quality)"""
+    show = rng.choice(SHOWS)
+    season = rng.randint(1, 6)
+    episode = rng.randint(1, 28) if rng.random() < 0.9 else rng.randint(100, 1150)
+    resolution = rng.choice(RESOLUTIONS)
+    ext = rng.choice(EXTENSIONS)
+    family = rng.choice([
+        "sxxeyy", "sxxeyy_spaced", "scene", "anime_dash", "anime_dash_season",
+        "season_episode_words", "ep_marker", "episode_dot", "nxm", "bracket",
+        "source_only", "half_episode",
+    ])
+    s2, e2 = f"{season:02d}", f"{episode:02d}"
+
+    if family == "sxxeyy":
+        name = f"{show} S{s2}E{e2} {resolution} {rng.choice(CODECS)}{ext}"
+        return name, family, season, episode, resolution
+    if family == "sxxeyy_spaced":
+        marker = rng.choice(["E", "EP"])
+        name = f"{show} S{s2} {marker}{e2} [{resolution}]{ext}"
+        return name, family, season, episode, resolution
+    if family == "scene":
+        source = rng.choice(SOURCES)
+        name = f"{dotted(show)}.S{s2}E{e2}.{resolution}.{source}.{rng.choice(['x264', 'x265', 'H.264'])}-{rng.choice(SCENE_GROUPS)}{ext}"
+        return name, family, season, episode, resolution
+    if family == "anime_dash":
+        tail = rng.choice([f" ({resolution})", f" [{resolution}]", f" [{resolution}] [{crc(rng)}]"])
+        name = f"[{rng.choice(GROUPS)}] {show} - {e2}{tail}{ext}"
+        return name, family, None, episode, resolution
+    if family == "anime_dash_season":
+        marker = rng.choice([f"S{season}", f"S{s2}", f"Season {season}"])
+        name = f"[{rng.choice(GROUPS)}] {show} {marker} - {e2} ({resolution}){ext}"
+        return name, family, season, episode, resolution
+    if family == "season_episode_words":
+        name = f"{show} Season {season} Episode {episode} {resolution}{ext}"
+        return name, family, season, episode, resolution
+    if family == "ep_marker":
+        marker = rng.choice(["EP", "E", "Ep "])
+        name = f"{show} {marker}{e2} {resolution} {rng.choice(AUDIO)}{ext}"
+        return name, family, None, episode, resolution
+    if family == "episode_dot":
+        marker = rng.choice(["Episode.", "Ep."])
+        name = f"{dotted(show)}.{marker}{e2}.{resolution}{ext}"
+        return name, family, None, episode, resolution
+    if family == "nxm":
+        name = f"{show} {season}x{e2} {resolution}{ext}"
+        return name, family, season, episode, resolution
+    if family == "bracket":
+        name = f"{show} [{e2}] [{resolution}]{ext}"
+        return name, family, None, episode, resolution
+    if family == "source_only":
+        source = rng.choice(SOURCES)
+        name = f"{dotted(show)}.S{s2}E{e2}.{source}.{rng.choice(AUDIO).replace(' ', '.')}{ext}"
+        return name, family, season, episode, source
+    # half_episode
+    name = f"[{rng.choice(GROUPS)}] {show} - {e2}.5 [{resolution}]{ext}"
+    return name, family, None, episode, resolution
+
+
+def release_names(count=4000, seed=2024):
+    rng = random.Random(seed)
+    return [release(rng) for _ in range(count)]
+
+
+def long_names(count, seed=5, length=200):
+    """Real releases padded with tag noise to `length`+ characters, the way
+    long multi-language releases arrive"""
+    rng = random.Random(seed)
+    noise = [
+        "[Multi-Subs]", "Dual.Audio", "HEVC", "10bit", "WEB-DL", "[English Dub]", "Hindi.Tamil.Telugu",
+        "(Batch)", "Complete", "REPACK", "PROPER", "ESub", "DDP5.1", "Atmos", "HDR10", "Remastered",
+        "Uncensored", "Directors.Cut", "[Re-Encoded]", "AAC2.0", "x265", "(Netflix)", "AMZN",
+    ]
+    names = []
+    for _ in range(count):
+        name = release(rng)[0]
+        root, ext = os.path.splitext(name)
+        while len(root) < length:
+            root += rng.choice([" ", ".", " - "]) + rng.choice(noise)
+        names.append(root + ext)
+    return names
+
+
+def bare_numbers(count, seed=3):
+    """Names where only a bare number tells the episode, so every episode
+    rule before Pattern X gets tried"""
+    rng = random.Random(seed)
+    return [
+        f"{rng.choice(SHOWS)} {rng.randint(1, 300)} {rng.choice(SOURCES)} {rng.choice(['Dual Audio', 'Multi Subs', 'Complete'])}{rng.choice(EXTENSIONS)}"
+        for _ in range(count)
+    ]
+
+
+def fuzz_names(count, seed=7):
+    """Noisy names for the golden equivalence test: real releases with random
+    separators, digits, brackets and words spliced in, plus plain junk"""
+    rng = random.Random(seed)
+    pieces = [
+        "S", "E", "EP", "Ep", "Episode", "Season", "Part", "Vol", "OVA", "SP", "No.", "#", "x",
+        "-", "_", ".", " ", "[", "]", "(", ")", "{", "}", "|", "*", "+", "=", "&", ":", "of",
+        "p", "P", "4k", "2K", "HdRip", "BluRay", "BD", "WEB-DL", "web", "HDTV", "TS", "DVD",
+        "IV", "XII", "Three", "twenty", "v2", "İ", "1080p", "720 p", "480_P", "12.5",
+    ]
+    names = []
+    for index in range(count):
+        if index % 3 == 0:
+            name = release(rng)[0]
+            cut = rng.randrange(len(name) + 1)
+            name = name[:cut] + rng.choice(pieces) + str(rng.randint(0, 2500)) + name[cut:]
+        else:
+            parts = []
+            for _ in range(rng.randint(1, 12)):
+                parts.append(str(rng.randint(0, 9999)) if rng.random() < 0.35 else rng.choice(pieces))
+            name = "".join(parts) + rng.choice(EXTENSIONS + [""])
+        names.append(name)
+    return names
+
+
+def load_corpus(path=CORPUS_PATH):
+    with open(path, newline="", encoding="utf-8") as file:
+        return list(csv.DictReader(file, delimiter="\t"))
+
+
+def write_corpus(path=CORPUS_PATH, count=4000):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file, delimiter="\t", lineterminator="\n")
+        writer.writerow(FIELDS)
+        for name, family, season, episode, quality in release_names(count):
+            writer.writerow([name, family, season or "", episode, quality])
+
+
+if __name__ == "__main__":
+    write_corpus()
+    print(f"Wrote {CORPUS_PATH}")
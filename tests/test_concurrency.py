@@ -0,0 +1,94 @@
+import sys
+import types
+import asyncio
+import importlib
+
+import pytest
+
+
+class FloodWait(Exception):
+    def __init__(self, value):
+        self.value = value
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def concurrency(monkeypatch, clock):
+    """helper.concurrency with a fake pyrogram.errors and a clock the test moves"""
+    errors = types.ModuleType("pyrogram.errors")
+    errors.FloodWait = FloodWait
+    monkeypatch.setitem(sys.modules, "pyrogram", types.ModuleType("pyrogram"))
+    monkeypatch.setitem(sys.modules, "pyrogram.errors", errors)
+    sys.modules.pop("helper.concurrency", None)
+    module = importlib.import_module("helper.concurrency")
+    monkeypatch.setattr(module, "time", clock)
+    yield module
+    sys.modules.pop("helper.concurrency", None)
+
+
+def transfer(limiter, clock, rate, windows):
+    """Fake transport: every slot busy for one window per step, moving
+    rate(limit) bytes a second; returns the limit after each window"""
+    limits = []
+    for _ in range(windows):
+        limiter.in_flight = limiter.limit
+        clock.now += limiter.window
+        limiter.record(int(rate(limiter.limit) * limiter.window))
+        limits.append(limiter.limit)
+    return limits
+
+
+def test_limit_grows_while_throughput_improves(concurrency, clock):
+    limiter = concurrency.AdaptiveLimiter("test", 2, maximum=6)
+    assert transfer(limiter, clock, lambda limit: limit * 1024 ** 2, 6) == [3, 4, 5, 6, 6, 6]
+    assert limiter.stats['increases'] == 4
+
+
+def test_step_that_bought_nothing_is_undone(concurrency, clock):
+    limiter = concurrency.AdaptiveLimiter("test", 2, maximum=8)
+    # The link saturates at 4 transfers; the fifth slot adds nothing
+    limits = transfer(limiter, clock, lambda limit: min(limit, 4) * 1024 ** 2, 6)
+    assert limits == [3, 4, 5, 4, 4, 4]
+    assert limiter.stats['decreases'] == 1
+
+
+def test_idle_slots_do_not_grow_the_limit(concurrency, clock):
+    limiter = concurrency.AdaptiveLimiter("test", 4, maximum=8)
+    limiter.busy = False
+    clock.now += limiter.window
+    limiter.record(10 * 1024 ** 2)
+    assert limiter.limit == 4
+
+
+def test_flood_wait_halves_the_limit_once_per_window(concurrency, clock):
+    limiter = concurrency.AdaptiveLimiter("test", 8, maximum=16)
+
+    async def flood():
+        async with limiter.slot():
+            raise FloodWait(5)
+
+    def hit():
+        with pytest.raises(FloodWait):
+            asyncio.run(flood())
+        return limiter.limit
+
+    assert hit() == 4
+    # Transfers already running hit the same wait, one cut is enough
+    clock.now += limiter.window / 2
+    assert hit() == 4
+    clock.now += limiter.window
+    assert hit() == 2
+    assert limiter.stats['congestion'] == 3
+    assert limiter.in_flight == 0
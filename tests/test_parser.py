@@ -0,0 +1,172 @@
+import os
+import time
+import asyncio
+
+import pytest
+
+import legacy_parser
+from bench_parser import accuracy, sequence_accuracy, latency, load_baseline, legacy_batches, versus_legacy
+from corpus import load_corpus, fuzz_names, long_names, bare_numbers
+from config import Config
+from helper import parser
+from helper.parser import build_parsed_name, match_episode, match_quality, match_tags, determine_file_type, sort_key
+
+# Names in the golden equivalence run, on top of the annotated corpus
+FUZZ_NAMES = int(os.environ.get("PARSER_FUZZ_NAMES", "60000"))
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    return load_corpus()
+
+
+@pytest.fixture(scope="module")
+def baseline():
+    return load_baseline()
+
+
+@pytest.fixture(scope="module")
+def golden_names(corpus):
+    return [row["name"] for row in corpus] + fuzz_names(FUZZ_NAMES) + long_names(2000) + bare_numbers(2000)
+
+
+def mismatches(names, legacy, current):
+    results = ((name, legacy(name), current(name)) for name in names)
+    return [result for result in results if result[1] != result[2]]
+
+
+def test_episode_matches_legacy_cascade(golden_names):
+    current = lambda name: match_episode(name)[0]
+    assert mismatches(golden_names, legacy_parser.extract_episode_number, current) == []
+
+
+def test_quality_matches_legacy_cascade(golden_names):
+    current = lambda name: match_quality(name)[0]
+    assert mismatches(golden_names, legacy_parser.extract_quality, current) == []
+    # Parsed names take the Pattern 11 word from the tag scan instead
+    current = lambda name: build_parsed_name(name).quality
+    assert mismatches(golden_names, legacy_parser.extract_quality, current) == []
+
+
+def test_accuracy_does_not_regress(corpus, baseline):
+    report = accuracy(corpus)
+    for family, expected in baseline["accuracy"].items():
+        for field in ("episode", "season", "quality"):
+            assert report[family][field] >= expected[field], (family, field)
+
+
+def test_sequencing_does_not_regress(corpus, baseline):
+    assert sequence_accuracy(corpus) >= baseline["sequence"]
+
+
+def test_latency_within_baseline(corpus, baseline):
+    # Generous margin, this only catches a parser that got several times slower
+    measured = latency([row["name"] for row in corpus[:1000]], repeat=1)
+    assert measured["p50_us"] <= baseline["latency"]["p50_us"] * 5
+
+
+@pytest.fixture(scope="module")
+def speed():
+    # Same names for the old cascade and the current matcher, best of three runs
+    return versus_legacy(legacy_batches(2000))
+
+
+def test_episode_matcher_is_not_slower_than_legacy(speed):
+    for label, rates in speed.items():
+        assert rates["episode"] >= rates["episode_legacy"], label
+
+
+def test_quality_detector_is_not_slower_than_legacy(speed):
+    for label, rates in speed.items():
+        assert rates["quality"] >= rates["quality_legacy"], label
+
+
+def test_quality_is_linear_on_adversarial_names():
+    # Long digit-heavy names made the old pattern5 backtrack for seconds
+    for name in ("1" * 300, "1234 " * 60, "123x" * 75 + "p", "[" + "9" * 250 + "]"):
+        started = time.perf_counter()
+        match_quality(name)
+        assert time.perf_counter() - started < 0.05, name
+
+
+@pytest.mark.parametrize("name, tags", [
+    ("[SubsPlease] Show - 01 (1080p) [ABCDEF12].mkv", ("", "", "", "SubsPlease", "ABCDEF12")),
+    ("Show.S01E01.1080p.WEB-DL.DDP5.1.H.264-GRP.mkv", ("H.264", "DDP", "", "GRP", "")),
+    ("Show 05 Dual Audio Multi-Subs AAC2.0 x265 JPN ENG.mkv", ("x265", "Dual Audio AAC", "Multi-Sub JPN ENG", "", "")),
+    ("[1080p] Show - 05.mkv", ("", "", "", "", "")),
+    ("[deadbeef] Show - 05-NTb.mkv", ("", "", "", "NTb", "DEADBEEF")),
+    ("Show.720p.WEB-DL.mkv", ("", "", "", "", "")),
+    ("Show 05 h265 aac2x eac35.mkv", ("H.265", "", "", "", "")),
+])
+def test_release_tags(name, tags):
+    assert match_tags(name)[:5] == tags
+
+
+def test_half_episode_sorts_between_episodes():
+    names = ["Show - 13.mkv", "Show - 12.5.mkv", "Show - 12.mkv"]
+    ordered = sorted(names, key=lambda name: sort_key(build_parsed_name(name), names.index(name)))
+    assert ordered == ["Show - 12.mkv", "Show - 12.5.mkv", "Show - 13.mkv"]
+
+
+@pytest.mark.parametrize("extension, file_type", [
+    (".mkv", "video"), (".MP4", "video"), (".ts", "video"),
+    (".flac", "audio"), (".M4A", "audio"),
+    (".srt", "document"), (".zip", "document"), ("", "document"),
+])
+def test_determine_file_type(extension, file_type):
+    assert determine_file_type(extension) == file_type
+
+
+def test_pool_results_match_inline_and_fill_the_memo(corpus, monkeypatch):
+    names = [row["name"] for row in corpus[:600]]
+    monkeypatch.setattr(Config, "PARSE_POOL_THRESHOLD", 100)
+    parser.reset_parser_stats()
+    try:
+        results = asyncio.run(parser.parse_filenames(names + names[:50]))
+        assert parser.parse_pool is not None
+        assert results == [build_parsed_name(name) for name in names + names[:50]]
+        # Asking again is served from the memo, not parsed a second time
+        misses = parser.parse_filename.cache_info().misses
+        assert [parser.parse_filename(name) for name in names] == results[:600]
+        assert parser.parse_filename.cache_info().misses == misses
+        assert parser.pool_results == {}
+    finally:
+        parser.close_parse_pool()
+    assert parser.parse_pool is None
+
+
+@pytest.mark.parametrize("name, season, episode", [
+    ("[SubsPlease] Show S2 - 03 (1080p).mkv", "2", "03"),
+    ("Show.S02.E01.mkv", "02", "01"),
+    ("Show Season 2 Episode 1.mkv", "2", "1"),
+    ("Show 2x05 720p.mkv", "2", "05"),
+    ("[SubsPlease] Show - 03 (1080p).mkv", None, "03"),
+])
+def test_season_is_found_whichever_rule_wins(name, season, episode):
+    parsed = build_parsed_name(name)
+    assert (parsed.season, parsed.episode) == (season, episode)
+
+
+def test_seasons_do_not_interleave():
+    names = ["Show S2 - 01.mkv", "Show S01E02.mkv", "Show Season 2 Episode 2.mkv", "Show S01E01.mkv"]
+    ordered = sorted(names, key=lambda name: sort_key(build_parsed_name(name), names.index(name)))
+    assert ordered == ["Show S01E01.mkv", "Show S01E02.mkv", "Show S2 - 01.mkv", "Show Season 2 Episode 2.mkv"]
+
+
+@pytest.mark.parametrize("name, episode, episode_range", [
+    ("Show 05-06.mkv", "06", ("05", "06")),
+    ("Show 05&06.mkv", "5", ("5", "06")),
+    ("Show S01E05-E06.mkv", "05", ("05", "06")),
+    ("[Grp] Show - 01-12 [1080p].mkv", "01", ("01", "12")),
+    ("Kaiju No 8 - 10.mkv", "10", None),
+    ("Show E05-10bit.mkv", "05", None),
+])
+def test_episode_range_is_found_whichever_rule_wins(name, episode, episode_range):
+    parsed = build_parsed_name(name)
+    assert (parsed.episode, parsed.episode_range) == (episode, episode_range)
+
+
+def test_range_sorts_by_its_first_episode():
+    names = ["Show 06.mkv", "Show 05-06.mkv", "Show 04.mkv"]
+    ordered = sorted(names, key=lambda name: sort_key(build_parsed_name(name), names.index(name)))
+    assert ordered == ["Show 04.mkv", "Show 05-06.mkv", "Show 06.mkv"]
@@ -0,0 +1,58 @@
+import pytest
+
+from helper import scratch
+from helper.scratch import place_download, safe_filename
+
+
+def test_place_download_moves_onto_target(tmp_path):
+    downloaded = tmp_path / "original.mkv"
+    downloaded.write_bytes(b"data")
+    target = tmp_path / "renamed.mkv"
+    assert place_download(str(downloaded), str(target)) == str(target)
+    assert target.read_bytes() == b"data"
+    assert not downloaded.exists()
+
+
+@pytest.mark.parametrize("downloaded", [None, "missing.mkv"])
+def test_place_download_raises_when_nothing_was_downloaded(tmp_path, downloaded):
+    target = tmp_path / "renamed.mkv"
+    if downloaded:
+        downloaded = str(tmp_path / downloaded)
+    with pytest.raises(Exception, match="Download of renamed.mkv failed"):
+        place_download(downloaded, str(target))
+
+
+def test_safe_filename_keeps_the_extension():
+    assert safe_filename("a/b\\c.mkv") == "a_b_c.mkv"
+    assert safe_filename("x" * 300 + ".mkv").endswith(".mkv")
+    assert safe_filename("...") == "file"
+
+
+@pytest.fixture
+def scratch_root(tmp_path, monkeypatch):
+    partial = tmp_path / "partial"
+    partial.mkdir()
+    monkeypatch.setattr(scratch, "SCRATCH_ROOT", str(tmp_path))
+    monkeypatch.setattr(scratch, "PARTIAL_DIR", str(partial))
+    monkeypatch.setattr(scratch, "THUMB_DIR", str(tmp_path / "thumbs"))
+    monkeypatch.setattr(scratch, "active_partials", {"busy"})
+    return tmp_path
+
+
+def fill(path, size):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * size)
+    return scratch.allocated_size(path.stat())
+
+
+def test_scratch_usage_splits_running_jobs_from_idle_partials_and_skips_thumbs(scratch_root):
+    job = fill(scratch_root / "1" / "job" / "e01.mkv", 64 * 1024)
+    busy = fill(scratch_root / "partial" / "busy.part", 32 * 1024)
+    idle = fill(scratch_root / "partial" / "stale.part", 16 * 1024)
+    idle += fill(scratch_root / "partial" / "stale.part.json", 10)
+    fill(scratch_root / "thumbs" / "cached.jpg", 8 * 1024)
+    assert scratch.scratch_usage() == (job + busy, idle)
+
+    assert scratch.drop_idle_partials() == idle
+    assert sorted(p.name for p in (scratch_root / "partial").iterdir()) == ["busy.part"]
+    assert scratch.scratch_usage() == (job + busy, 0)
@@ -0,0 +1,32 @@
+import pytest
+
+from helper.template import compile_template, render_template, render_caption
+
+VALUES = {"episode": "05", "quality": "720p", "season": "02", "ext": ".mkv"}
+
+
+@pytest.mark.parametrize("template, expected", [
+    ("Show EPepisode quality.mkv", "Show EP05 720p SUF.mkv"),
+    ("Show EP{episode} {quality}{ext}", "Show EP05 720p SUF.mkv"),
+    ("Show EP{episode} {quality}", "Show EP05 720p SUF.mkv"),
+    ("Show S{season}E{episode} {quality}.mkv", "Show S02E05 720p SUF.mkv"),
+])
+def test_suffix_goes_before_the_extension(template, expected):
+    assert render_template(compile_template(template, suffix="SUF"), VALUES) == expected
+
+
+def test_prefix_and_no_suffix():
+    assert render_template(compile_template("EP{episode}", prefix="PRE"), VALUES) == "PRE EP05.mkv"
+
+
+def test_suffix_without_extension():
+    values = dict(VALUES, ext="")
+    assert render_template(compile_template("Show {episode}", suffix="SUF"), values) == "Show 05 SUF"
+
+
+def test_braced_template_keeps_literal_words():
+    assert render_template(compile_template("episode {episode}"), VALUES) == "episode 05.mkv"
+
+
+def test_caption_leaves_unknown_braces():
+    assert render_caption("{filename} {unknown} {duration}", {"filename": "a.mkv"}) == "a.mkv {unknown} {duration}"